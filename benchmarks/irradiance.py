@@ -0,0 +1,82 @@
+# Irradiance benchmark
+# Compares generation's cloud cover -> GHI -> DNI/DHI stage with pvlib's
+# (GFS.cloud_cover_to_ghi_linear, where pvlib still has it, and
+# irradiance.disc) on a year of 48 hour horizons, for accuracy and speed.
+#
+#   python benchmarks/irradiance.py
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import generation
+from pvlib.location import Location
+from pvlib.irradiance import disc
+
+try:
+    from pvlib.forecast import GFS
+except ImportError:
+    GFS = None
+
+
+def pvlib_irradiance(cloud_cover, clearsky, solpos, times):
+    """The stage as it was, on pvlib
+    """
+
+    if GFS:
+        ghi = GFS().cloud_cover_to_ghi_linear(cloud_cover * 100, clearsky['ghi'])
+    else:
+        ghi = (0.35 + 0.65 * (1 - cloud_cover)) * clearsky['ghi']
+
+    dni = disc(ghi, solpos['zenith'], times)['dni']
+    dhi = ghi - dni * np.cos(np.radians(solpos['zenith']))
+
+    return ghi, dni, dhi
+
+
+def local_irradiance(cloud_cover, clearsky, solpos, times):
+    """The stage as it is now
+    """
+
+    zenith = solpos['zenith'].to_numpy(dtype=float)
+
+    ghi = generation.cloud_cover_to_ghi(
+        cloud_cover.to_numpy(dtype=float) * 100,
+        clearsky['ghi'].to_numpy(dtype=float)
+    )
+    dni = generation.disc_dni(ghi, zenith, times.dayofyear)
+    dhi = ghi - dni * np.cos(np.radians(zenith))
+
+    return ghi, dni, dhi
+
+
+if __name__ == '__main__':
+
+    location = Location(57.6568, -3.5818, altitude=10)
+    times = pd.date_range('2019-01-01', periods=24 * 365, freq='h',
+                          tz='Europe/London')
+
+    cloud_cover = pd.Series(
+        np.random.default_rng(0).uniform(0, 1, times.size), index=times
+    )
+    clearsky = location.get_clearsky(times, model='simplified_solis')
+    solpos = location.get_solarposition(times)
+
+    worst = 0.
+    for ours, theirs in zip(
+            local_irradiance(cloud_cover, clearsky, solpos, times),
+            pvlib_irradiance(cloud_cover, clearsky, solpos, times)):
+        worst = max(worst, np.nanmax(np.abs(np.asarray(ours) - np.asarray(theirs))))
+
+    print(f"Largest difference from pvlib over a year: {worst:.2e} W/m2")
+
+    horizon = slice(0, 49)
+    arguments = (cloud_cover[horizon], clearsky[horizon], solpos[horizon],
+                 times[horizon])
+
+    for name, stage in [('pvlib', pvlib_irradiance), ('local', local_irradiance)]:
+        runs, seconds = timeit.Timer(lambda: stage(*arguments)).autorange()
+        print(f"{name}: {seconds / runs * 1e6:.0f} us per 48 hour horizon")
@@ -0,0 +1,117 @@
+# PV power benchmark
+# Checks generation.PVArrays against a pvlib ModelChain per array (as
+# LocalRE used to model them) for the Findhorn arrays, on a year of hourly
+# forecasts, then times both on a 48 hour horizon. Exits with an error if
+# any array's AC power differs by more than the tolerance.
+#
+#   python benchmarks/pv.py
+import copy
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler.generation import LocalRE
+from pvlib.modelchain import ModelChain
+
+# The Findhorn arrays (see findhorn_single.py)
+pv_arrays = [
+    {
+        'name' : 'Terrace',
+        'surface_tilt' : 30,
+        'surface_azimuth' : 163,
+        'surface_type' : 'grass',
+        'modules_per_string' : 10,
+        'strings_per_inverter' : 2,
+        'module_name' : 'SunPower_SPR_X22_360_COM',
+        'inverter_name' : 'SolarEdge_Technologies_Ltd___SE6000__240V__240V__CEC_2018_'
+    },
+    {
+        'name' : 'Studios block',
+        'surface_tilt' : 34,
+        'surface_azimuth' : 180,
+        'surface_type' : 'grass',
+        'modules_per_string' : 11,
+        'strings_per_inverter' : 1,
+        'module_name' : 'SunPower_SPR_X22_360_COM',
+        'inverter_name' : 'SolarEdge_Technologies_Ltd___SE3300__240V__240V__CEC_2018_'
+    }
+]
+
+# Largest difference in any array's AC power we'll accept (W)
+tolerance = 1e-3
+
+
+def modelchain_power(site: LocalRE, modelchains: dict) -> np.ndarray:
+    """PV power as it was, a ModelChain per array
+
+    Arguments:
+        site {LocalRE} -- the site, with its PV forecast made
+        modelchains {dict} -- pvlib ModelChains by PV array name
+    """
+
+    times = site.pv_forecast.index
+
+    return np.column_stack([
+        modelchains[name].run_model(times, site.pv_forecast).ac.to_numpy(dtype=float)
+        for name in site.pv_model.names
+    ])
+
+
+def local_power(site: LocalRE, modelchains: dict) -> np.ndarray:
+    """PV power as it is now, all the arrays together
+    """
+
+    return site.pv_model.ac(site.pv_forecast)
+
+
+if __name__ == '__main__':
+
+    site = LocalRE(pv_arrays=copy.deepcopy(pv_arrays))
+
+    modelchains = {
+        name: ModelChain(
+            system,
+            site.pv_location,
+            aoi_model='physical',
+            spectral_model='no_loss'
+        )
+        for name, system in site.pv_systems.items()
+    }
+
+    times = pd.date_range('2019-01-01', periods=24 * 365, freq='h',
+                          tz='Europe/London')
+    rng = np.random.default_rng(0)
+
+    forecast = pd.DataFrame({
+        'cloudCover': rng.uniform(0, 1, times.size),
+        'temperature': rng.uniform(-5, 25, times.size),
+        'windSpeed': rng.weibull(2, times.size) * 8,
+    }, index=times)
+
+    site.make_generation_forecasts(forecast)
+
+    ours = local_power(site, modelchains)
+    theirs = modelchain_power(site, modelchains)
+
+    if not (np.isnan(ours) == np.isnan(theirs)).all():
+        sys.exit("PV power is missing for different hours than pvlib's")
+
+    worst = 0.
+    for number, name in enumerate(site.pv_model.names):
+        difference = np.nanmax(np.abs(ours[:, number] - theirs[:, number]))
+        worst = max(worst, difference)
+
+        print(f"{name}: largest difference {difference:.2e} W")
+
+    site.make_generation_forecasts(forecast.iloc[:49])
+
+    for name, stage in [('ModelChain', modelchain_power), ('local', local_power)]:
+        runs, seconds = timeit.Timer(lambda: stage(site, modelchains)).autorange()
+        print(f"{name}: {seconds / runs * 1e6:.0f} us per 48 hour horizon")
+
+    if worst > tolerance:
+        sys.exit(f"PV power differs from pvlib by up to {worst:.2e} W")
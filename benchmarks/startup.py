@@ -0,0 +1,75 @@
+# Startup time benchmark
+# Times `import scheduler` (and building a renewables model with no sources)
+# in fresh interpreters, and checks the heavy dependencies stay unimported.
+#
+#   python benchmarks/startup.py [--runs 5] [--max-seconds 1.0]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Imported only once a PV or wind model is set up or run
+HEAVY_MODULES = ['pvlib', 'windpowerlib', 'scipy', 'tables']
+
+SNIPPET = """
+import json, sys, time
+started = time.perf_counter()
+import scheduler
+imported = time.perf_counter()
+scheduler.generation.LocalRE()
+built = time.perf_counter()
+print(json.dumps({
+    'import' : imported - started,
+    'renewables' : built - imported,
+    'heavy' : [ name for name in %r if name in sys.modules ]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once() -> dict:
+    """Time one fresh interpreter
+    """
+
+    repository = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    output = subprocess.run(
+        [sys.executable, '-c', SNIPPET],
+        cwd=repository, capture_output=True, text=True, check=True
+    ).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Time importing the scheduler in fresh interpreters, and '
+                    'check pvlib, windpowerlib, SciPy and PyTables stay unimported'
+    )
+    parser.add_argument('--runs', type=int, default=5,
+                        help='fresh interpreters to time')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='fail if the median import takes longer')
+    arguments = parser.parse_args()
+
+    results = [ run_once() for run in range(arguments.runs) ]
+
+    import_times = [ result['import'] for result in results ]
+    renewables_times = [ result['renewables'] for result in results ]
+    heavy = sorted(set(sum((result['heavy'] for result in results), [])))
+
+    print(f"import scheduler: median {statistics.median(import_times):.3f}s, "
+          + f"best {min(import_times):.3f}s")
+    print("LocalRE() with no sources: median "
+          + f"{statistics.median(renewables_times) * 1000:.1f}ms")
+    print("Heavy modules imported: " + (', '.join(heavy) or 'none'))
+
+    failed = bool(heavy)
+
+    if (arguments.max_seconds is not None
+            and statistics.median(import_times) > arguments.max_seconds):
+        failed = True
+
+    sys.exit(1 if failed else 0)
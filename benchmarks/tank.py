@@ -0,0 +1,120 @@
+# Tank timestep benchmark
+# Checks Tank.process_timestep (LAPACK tridiagonal solve) against the
+# original method - a node by node loop building a dense matrix for
+# np.linalg.solve - for 5 to 200 node tanks, then times both. Exits with an
+# error if they don't agree, or if a 5 node timestep got slower.
+#
+#   python benchmarks/tank.py
+import os
+import sys
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler.hotwatertank import Tank
+
+
+def dense_timestep(tank: Tank) -> np.ndarray:
+    """The timestep's new temperatures as they used to be worked out
+    """
+
+    cp = tank.fluid_specific_heat
+    conductance = tank.fluid_conductance * tank._node_area / tank._node_height
+
+    A = np.array([[0.0]*tank.nodes]*tank.nodes)
+    C = np.array([0.0]*tank.nodes)
+
+    mass_upflow_in = 0.0
+
+    for n in range(0, tank.nodes):
+
+        mass_upflow_out = ( mass_upflow_in
+                            + tank.input_masses[n]
+                            - tank.output_masses[n] )
+
+        loss_area = tank._node_surface
+        if n==0 or n==(tank.nodes-1):
+            loss_area += tank._node_area
+
+        A[n,n] = ( (tank._node_mass * cp / tank.timestep)
+                   + tank.output_masses[n] * cp
+                   + conductance
+                   + tank.wall_U_value * loss_area )
+
+        if n>0 and n<tank.nodes-1:
+            A[n,n] += conductance
+
+        if mass_upflow_out > 0:
+            A[n,n] += mass_upflow_out * cp
+
+        if mass_upflow_in < 0:
+            A[n,n] -= mass_upflow_in * cp
+
+        if n>0:
+            A[n,n-1] = -conductance
+            if mass_upflow_in > 0:
+                A[n,n-1] -= mass_upflow_in * cp
+
+        if n<tank.nodes-1:
+            A[n,n+1] = -conductance
+            if mass_upflow_out < 0:
+                A[n,n+1] += mass_upflow_out * cp
+
+        C[n] = ( ( tank._node_mass * cp * tank.node_temps[n] / tank.timestep )
+                 + tank.wall_U_value * loss_area * tank.T_amb
+                 + ( tank.input_masses[n] * cp * tank.input_temps[n] ) )
+
+        mass_upflow_in = mass_upflow_out
+
+    return np.linalg.solve(A, C)
+
+
+def make_tank(nodes: int) -> Tank:
+    """A tank part way through a day, with heat going in and load coming out
+    """
+
+    tank = Tank(nodes, volume=0.55,
+                start_node_temps=list(np.linspace(35, 55, nodes)))
+
+    for _ in range(3):
+        tank.inject_heat(50., 60.)
+        tank.draw_load(1.5)
+        tank.process_timestep()
+
+    tank.inject_heat(50., 60.)
+    tank.draw_load(1.5)
+
+    return tank
+
+
+if __name__ == '__main__':
+
+    worst = 0.
+    timings = {}
+
+    for nodes in [5, 20, 50, 200]:
+
+        tank = make_tank(nodes)
+        expected = dense_timestep(tank)
+        tank.process_timestep()
+        worst = max(worst, np.abs(tank.node_temps - expected).max())
+
+        for name, stage in [('dense', dense_timestep),
+                            ('tridiagonal', Tank.process_timestep)]:
+            tank = make_tank(nodes)
+            timer = timeit.Timer(lambda: stage(tank))
+            runs = timer.autorange()[0]
+            timings[name, nodes] = min(timer.repeat(7, runs)) / runs
+
+        print(f"{nodes} nodes: dense {timings['dense', nodes] * 1e6:.0f} us, "
+              f"tridiagonal {timings['tridiagonal', nodes] * 1e6:.0f} us "
+              "per timestep")
+
+    print(f"Largest difference from the dense solve: {worst:.2e} C")
+
+    if worst > 1e-9:
+        sys.exit(f"Tank temperatures differ by up to {worst:.2e} C")
+
+    if timings['tridiagonal', 5] > timings['dense', 5]:
+        sys.exit("A 5 node timestep is slower than the dense solve")
@@ -0,0 +1,125 @@
+# Wind power benchmark
+# Checks generation.WindFarmCurve against windpowerlib's
+# TurbineClusterModelChain (which it stands in for) on a year of hourly wind
+# speeds, for each wind speed and wake loss model it covers, then times both
+# on a 48 hour horizon. Fails with an AssertionError if they differ by more
+# than the tolerance. The farm is built by LocalRE, so this needs the
+# windpowerlib the scheduler is written for (WindTurbine(name, hub_height,
+# ...), as in 0.1.x).
+#
+#   python benchmarks/wind.py
+import os
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler.generation import LocalRE, WindFarmCurve
+
+# The README's wind farm
+turbines = [{
+    'name' : 'Vestas V29',
+    'hub_height' : 30,
+    'nominal_power' : 225e3,
+    'rotor_diameter' : 29,
+    'power_curve' : pd.DataFrame(
+        data={
+            'value': [ p * 1000 for p in [
+                0.0, 0.0, 2.1, 7.1, 20.5, 38.3, 61.9, 92.2, 128, 165,
+                196, 216, 223, 225, 225, 0, 0
+            ]],
+            'wind_speed': [
+                0.0, 3.0, 3.5, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0,
+                11.0, 12.0, 13.0, 14.0, 25.0, 26, 27
+            ]
+        }
+    ),
+    'qty' : 3
+}]
+
+# Largest difference in wind power we'll accept (W)
+tolerance = 1e-6
+
+
+def make_site(wind_speed_model: str, wake_losses_model: str) -> LocalRE:
+    """Set up the wind farm with the given models
+
+    Arguments:
+        wind_speed_model {string} -- windpowerlib wind speed model
+        wake_losses_model {string} -- windpowerlib wake losses model
+    """
+
+    # Built just as the scheduler builds it
+    try:
+        site = LocalRE(wind_turbines=turbines)
+    except TypeError as err:
+        sys.exit(f"This windpowerlib won't build the wind farm as LocalRE "
+                 f"does ({err}); it needs the version the scheduler targets")
+
+    modelchain = site.wind_modelchain
+    modelchain.wind_speed_model = wind_speed_model
+    modelchain.wake_losses_model = wake_losses_model
+
+    site.wind_model = WindFarmCurve(
+        modelchain, site.roughness_length, site.forecast_height
+    )
+
+    return site
+
+
+def windpowerlib_power(site: LocalRE, forecast: pd.DataFrame) -> np.ndarray:
+    """Wind power as it was, through windpowerlib
+    """
+
+    site.wind_modelchain.run_model(site._make_wind_forecast(forecast))
+
+    return site.wind_modelchain.power_output.to_numpy(dtype=float)
+
+
+def local_power(site: LocalRE, forecast: pd.DataFrame) -> np.ndarray:
+    """Wind power as it is now
+    """
+
+    return site.wind_model.power_output(
+        forecast['windSpeed'].to_numpy(dtype=float)
+    )
+
+
+if __name__ == '__main__':
+
+    times = pd.date_range('2019-01-01', periods=24 * 365, freq='h',
+                          tz='Europe/London')
+    rng = np.random.default_rng(0)
+
+    forecast = pd.DataFrame({
+        'windSpeed': rng.weibull(2, times.size) * 8,
+        'temperature': rng.uniform(-5, 25, times.size),
+        'pressure': rng.uniform(98000, 103000, times.size),
+        'windBearing': rng.uniform(0, 360, times.size),
+    }, index=times)
+
+    for wind_speed_model in ['logarithmic', 'hellman']:
+        for wake_losses_model in ['dena_mean', 'knorr_mean', None]:
+
+            site = make_site(wind_speed_model, wake_losses_model)
+            ours = local_power(site, forecast)
+            theirs = windpowerlib_power(site, forecast)
+
+            print(f"{wind_speed_model}, {wake_losses_model}: largest "
+                  f"difference {np.nanmax(np.abs(ours - theirs)):.2e} W")
+
+            np.testing.assert_allclose(
+                ours, theirs, rtol=0, atol=tolerance,
+                err_msg=f"{wind_speed_model}, {wake_losses_model}: wind "
+                        "power differs from windpowerlib"
+            )
+
+    horizon = forecast.iloc[:49]
+    site = make_site('logarithmic', 'dena_mean')
+
+    for name, stage in [('windpowerlib', windpowerlib_power),
+                        ('local', local_power)]:
+        runs, seconds = timeit.Timer(lambda: stage(site, horizon)).autorange()
+        print(f"{name}: {seconds / runs * 1e6:.0f} us per 48 hour horizon")
@@ -110,7 +110,8 @@ sch = scheduler.Scheduler(
     reserved_wind_power = 123.4,     # kWh based on local consumption
     roughness_length = 0.15,     # bit of a guess
     hellman_exp = 0.2,
-    housing_stock = housing_stock
+    housing_stock = housing_stock,
+    warm_start = True       # each hour's plan starts from the last one
 )
 
 
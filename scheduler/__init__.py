@@ -4,7 +4,9 @@ from . import hotwatertank
 from . import demand
 from . import simulator
 from . import forecast
+from . import planner
 import warnings
+from time import monotonic
 import pandas as pd
 import numpy as np
 from typing import Union, Tuple
@@ -13,6 +15,9 @@ from typing import Union, Tuple
 class SchedulerError(Exception):
     pass
 
+class SchedulerTimeout(SchedulerError):
+    pass
+
 class Scheduler(object):
     """Class to perform the scheduling of heat pump operation
 
@@ -52,6 +57,29 @@ class Scheduler(object):
     # Comfort condition - minimum network temperature
     minimum_temperature = 38
 
+    # How to search for a schedule: 'greedy' adds the best hour before each
+    # failure in turn, 'bisect' bisects on how many of the best hours to use,
+    # 'milp' plans the whole horizon with a linearised tank model and 'dp' by
+    # dynamic programming over the tank's stored energy
+    search_mode = 'greedy'
+
+    # Whether the greedy search starts from the previous hour's schedule
+    warm_start = False
+
+    # Wall clock seconds the search may take before we settle for the best
+    # schedule found so far (None for no limit)
+    time_budget = None
+
+    # Whether the last search finished rather than running out of time
+    converged = True
+
+    _search_modes = {
+        'greedy' : '_greedy_search',
+        'bisect' : '_bisect_search',
+        'milp' : '_milp_search',
+        'dp' : '_dp_search'
+    }
+
     tank_characteristics = {
 
     }
@@ -59,15 +87,33 @@ class Scheduler(object):
     # That's all the local condition data we want.
 
 
-    # This will hold our on/off schedule
+    # This will hold our on/off schedule (during a search it may be a bool
+    # array on the surplus hours)
     _schedule = []
 
+    # Positions of the hours in order of surplus, best first, and the hours
+    # themselves
+    _hour_priority = None
+    _hour_times = None
+
+    # Best schedule simulated so far and its outcome, and when to stop looking
+    _best = None
+    _deadline = None
+
     # This will hold our forecast, but keep it empty for now
     _forecast = None
 
+    # How old (seconds) the forecaster said our forecast was, if it knows
+    forecast_age = None
+
     # This is where we will output our logs (set by constructor)
     log_filename = None
 
+    # Forecaster and renewables models - built by the constructor unless
+    # we're given ones to share with other schedulers
+    weatherman = None
+    renewables = None
+
     # If this is set in the constructor then we aren't living in the present
     start_time = None
 
@@ -94,6 +140,20 @@ class Scheduler(object):
             'performance_factor' {float} -- as multiple of template demand profile
             'reserved_wind_power' {float} -- absolute constant value for margin
                 to determine surplus
+            'search_mode' {string} -- 'greedy' (default), 'bisect', 'milp' or
+                'dp'
+            'warm_start' {bool} -- start each greedy search from the previous
+                hour's schedule
+            'time_budget' {float} -- seconds the search may take before it
+                settles for the best schedule found so far
+            'weatherman' {forecast.ForecastProvider} -- where to get forecasts:
+                defaults to DarkSky (needing an API key), or e.g. a
+                forecast.ReplayForecaster for offline runs. May be shared with
+                other schedulers at the same location
+            'renewables' {generation.LocalRE} -- a renewables model to share
+                with other schedulers with the same generation (optional)
+            'plan_on_init' {bool} -- whether to plan the first hour straight
+                away (default True)
                 'pv_arrays', 'wind_farm', 'hellman_exp', 'roughness_length',
                  (see generation module),
                 'tank_characteristics' (see Tank module)
@@ -105,24 +165,28 @@ class Scheduler(object):
             'baseline_scenario', 'network_losses', 'start_time',
             'pumping_energy', 'performance_factor', 'reserved_wind_power',
             'pv_arrays', 'wind_farm', 'tank_characteristics', 'hellman_exp',
-            'roughness_length', 'log_filename']
+            'roughness_length', 'log_filename', 'search_mode', 'warm_start',
+            'time_budget', 'weatherman', 'renewables']
 
         for key in kwargs_to_load:
             if kwargs.get(key):
                 setattr(self, key, kwargs.get(key))
 
-        # Look for our API key
-        try:
-            with open('darksky_api_key.txt', 'r') as f:
-                API_key = f.read()
-                f.close()
-        except Exception as err:
-            # And that's pretty much the end of that.
-            raise SchedulerError('DarkSky API key could not be loaded')
+        if not self.weatherman:
+
+            # Look for our API key
+            try:
+                with open('darksky_api_key.txt', 'r') as f:
+                    API_key = f.read()
+                    f.close()
+            except Exception as err:
+                # And that's pretty much the end of that.
+                raise SchedulerError('DarkSky API key could not be loaded')
+
+            self.weatherman = forecast.Forecaster(
+                API_key, self.latitude, self.longitude, self.tz
+            )
 
-        self.weatherman = forecast.Forecaster(
-            API_key, self.latitude, self.longitude, self.tz
-        )
         self.demands = demand.DemandModel(self.housing_stock)
 
         # Create a five node, 750L tank
@@ -132,15 +196,16 @@ class Scheduler(object):
         self.heatpump = heatpump.HeatPump()
 
         # Instantiate our renewable energy sources
-        self.renewables = generation.LocalRE(
-            wind_turbines = self.wind_farm,
-            pv_arrays = self.pv_arrays,
-            latitude = self.latitude,
-            longitude = self.longitude,
-            altitude = self.altitude,
-            roughness_length = self.roughness_length,
-            hellman_exp = self.hellman_exp,
-        )
+        if not self.renewables:
+            self.renewables = generation.LocalRE(
+                wind_turbines = self.wind_farm,
+                pv_arrays = self.pv_arrays,
+                latitude = self.latitude,
+                longitude = self.longitude,
+                altitude = self.altitude,
+                roughness_length = self.roughness_length,
+                hellman_exp = self.hellman_exp,
+            )
 
         # Did we get given a start time for this simulation using
         # historic/future data?
@@ -160,7 +225,23 @@ class Scheduler(object):
 
 
         # Plan our first hour!
-        self.run_model(self.start_time)
+        if kwargs.get('plan_on_init', True):
+            self.run_model(self.start_time)
+
+
+    def __getstate__(self) -> dict:
+        """Leave the forecaster and renewables models behind when pickled
+
+        These may be shared with other schedulers and are only needed to
+        update the forecast and surplus, not to plan (e.g. in a worker
+        process).
+        """
+
+        state = self.__dict__.copy()
+        state.pop('weatherman', None)
+        state.pop('renewables', None)
+
+        return state
 
 
     def _signal_heatpump(self, active, time:pd.Timestamp):
@@ -180,50 +261,122 @@ class Scheduler(object):
 
 
 
-    def run_model(self, start_time: pd.Timestamp = None):
+    def run_model(
+            self,
+            start_time: pd.Timestamp = None,
+            time_budget: float = None
+        ):
         """Create schedule
 
         Updates forecast, predicts surplus from generation and demand and runs
-        scenarios to find best way of meeting comfort criteria.
+        scenarios to find best way of meeting comfort criteria, then signals
+        the heat pump. If the search runs over the time budget, uses the best
+        schedule it found so far and sets converged to False.
 
         Arguments:
             start_time {pd.Timestamp} -- start time if running on historical
                 data or a future time within current data set
+            time_budget {float} -- seconds allowed, counted from now (defaults
+                to the time_budget attribute)
         """
 
-        # Open our log file (we reopen it every hour so we can read it between)
-        log_file = open(self.log_filename,'a+') if self.log_filename else None
+        if time_budget is None:
+            time_budget = self.time_budget
 
-        if log_file:
-            log_file.write('Simulation starting ' +
-                (str(start_time) if start_time else 'for current hour') + '\n')
+        started = monotonic()
 
         # 1. Get forecast
+        self.update_forecast(start_time)
+
+        # 2. (in future work:) Determine demand used since previous timestep
+        #    & learn from it
+
+        # 3. Predict surplus
+        self.predict_surplus()
+
+        # 4 & 5. Generate and simulate scenarios until we meet comfort
+        # criteria, with whatever time the forecast has left us
+        if time_budget is not None:
+            time_budget = max(time_budget - (monotonic() - started), 0)
+
+        self.plan(start_time, time_budget)
+
+        # Now send the signal to the heatpump for the first hour
+        self._signal_heatpump(
+            self._schedule.iloc[0], start_time or pd.Timestamp.now(tz=self.tz)
+        )
+
+
+    def update_forecast(
+            self,
+            start_time: pd.Timestamp = None,
+            forecast: pd.DataFrame = None,
+            forecast_age: float = None
+        ):
+        """Get the forecast for this hour
+
+        If the forecast can't be retrieved, uses the previous one an hour
+        shorter.
+
+        Arguments:
+            start_time {pd.Timestamp} -- start time if running on historical
+                data or a future time within current data set
+            forecast {pd.DataFrame} -- a forecast already retrieved for this
+                location, if we're sharing one (optional)
+            forecast_age {float} -- how old that forecast is, in seconds
+                (optional)
+        """
+
+        if forecast is not None:
+            self._forecast = forecast
+            self.forecast_age = forecast_age
+            return
 
         try:
             forecast = self.weatherman.get_forecast(start_time)
             self._forecast = forecast
+            self.forecast_age = getattr(self.weatherman, 'forecast_age', None)
         except Exception as err:
-            if not self._forecast:
-                # We don't have a forecast from last time.
-                # - so We can't operate at this timestep
-                raise SchedulerError('Cannot get first forecast.')
-            else:
-                # Shave an hour off the previous forecast and run using
-                # shortened horizon
-                warnings.warn('Could not retrieve forecast at this timestamp, using previous')
-                self._forecast = self._forecast.drop(self._forecast.index[0])
+            self.reuse_forecast()
 
-        # 2. (in future work:) Determine demand used since previous timestep
-        #    & learn from it
 
-        # 3. Predict surplus
+    def reuse_forecast(self):
+        """Carry on with the previous forecast an hour shorter
+
+        For when we couldn't get a new forecast this hour.
+        """
 
-        self.renewables.make_generation_forecasts(self._forecast)
+        if self._forecast is None:
+            # We don't have a forecast from last time.
+            # - so We can't operate at this timestep
+            raise SchedulerError('Cannot get first forecast.')
 
-        self.generation = self.renewables.predict_generation(
-            self.reserved_wind_power
-        )
+        # Shave an hour off the previous forecast and run using
+        # shortened horizon
+        warnings.warn('Could not retrieve forecast at this timestamp, using previous')
+        self._forecast = self._forecast.drop(self._forecast.index[0])
+
+        if self.forecast_age is not None:
+            self.forecast_age += 3600
+
+
+    def predict_surplus(self, generation: pd.DataFrame = None):
+        """Predict generation, demand and the surplus for the current forecast
+
+        Arguments:
+            generation {pd.DataFrame} -- a generation prediction already made
+                for this forecast by identical renewables, if we're sharing one
+                (optional)
+        """
+
+        if generation is None:
+            self.renewables.make_generation_forecasts(self._forecast)
+
+            generation = self.renewables.predict_generation(
+                self.reserved_wind_power
+            )
+
+        self.generation = generation
 
         scale = ( (1+self.network_losses + self.pumping_energy)
                   * self.performance_factor)
@@ -235,46 +388,75 @@ class Scheduler(object):
         # Pull out the surplus/shortfall series here (on the same index)
         self._surplus = self.generation['surplus']
 
-        # Repeat the following until we meet comfort criteria
+        # Rank the hours by surplus once, for adding hours to schedules
+        self._hour_priority = np.argsort(
+            -self._surplus.to_numpy(dtype=float), kind='stable'
+        )
+        self._hour_times = self._surplus.index.to_numpy(dtype='datetime64[ns]')
 
-        # 4. Generate scenario - at first 'no heating'
-        self._schedule = pd.Series(0, index=self._surplus.index)
 
-        comfort_conditions_met = False
+    def plan(
+            self,
+            start_time: pd.Timestamp = None,
+            time_budget: float = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Search for the schedule for the current forecast and surplus
 
-        # Repeat until we have an outcome
-        while True:
+        Leaves the schedule chosen in place and returns its outcome. Reports it
+        (and the baseline scenario, if we have one) but doesn't signal the heat
+        pump.
 
-            print("Running scenario: "
-                  + str(self._schedule[self._schedule==1].size)
-                  + "hours of heating")
+        Arguments:
+            start_time {pd.Timestamp} -- start time if running on historical
+                data or a future time within current data set
+            time_budget {float} -- seconds the search may take (optional)
+        """
 
-            # 5. Simulate next 48 hours with the current schedule
-            elec_used, elec_imported, failure_time = self.simulator.run_simulation(
-                self.tank,
-                forecast,
-                self._demand,
-                self._schedule,
-                self._surplus,
-                log_file
-            )
+        # Open our log file (we reopen it every hour so we can read it between)
+        log_file = open(self.log_filename,'a+') if self.log_filename else None
 
-            # Two ways out of this endless loop - either we succeeded...
-            if not failure_time:
-                break
+        if log_file:
+            log_file.write('Simulation starting ' +
+                (str(start_time) if start_time else 'for current hour') + '\n')
 
-            # ...or we ran out of hours to add heating in
-            print("Scenario has failed at ", str(failure_time))
+            if self.forecast_age is not None:
+                log_file.write(f'Forecast age {self.forecast_age:.0f}s\n')
 
-            # Repeat 4 - generate new schedule by adding an hour's heating
-            added_another_hour = self._add_hour(failure_time)
+        if self.search_mode not in self._search_modes:
+            raise SchedulerError('Unknown search mode: ' + str(self.search_mode))
 
-            if not added_another_hour:
-                # We had no more hours to add - time to give up!
-                break
+        search = getattr(self, self._search_modes[self.search_mode])
+
+        # Start from last hour's schedule if we have one
+        if (self.warm_start and self.search_mode == 'greedy'
+                and isinstance(self._schedule, pd.Series)):
+            search = self._warm_start_search
+
+        self._best = None
+        self._deadline = (
+            (monotonic() + time_budget) if time_budget is not None else None
+        )
+
+        try:
+            elec_used, elec_imported, failure_time = search(log_file)
+            self.converged = True
+        except SchedulerTimeout:
+            warnings.warn('Search ran out of time, using best schedule so far')
+            self.converged = False
+            self._schedule, (elec_used, elec_imported, failure_time) = self._best
+        finally:
+            self._deadline = None
+
+        # Searches that work on an array get it made into a schedule here
+        if isinstance(self._schedule, np.ndarray):
+            self._schedule = pd.Series(
+                self._schedule.astype(int), index=self._surplus.index
+            )
+
+        outcome = elec_used, elec_imported, failure_time
 
         # If we are heating all the time, that's gotta be worth a warning.
-        if failure_time:
+        if failure_time and self.converged:
             warnings.warn('Could not maintain comfort conditions even with continuous heating')
 
         # Report scenario
@@ -285,7 +467,9 @@ class Scheduler(object):
         run_notice = (f"At time {time} the optimal scenario has "
                       + f"{self._schedule.sum()} hours of heating, requiring "
                       + f"{elec_used}kWh of electricity of which "
-                      + f"{elec_imported}kWh ({import_percent}%) was imported")
+                      + f"{elec_imported}kWh ({import_percent}%) was imported"
+                      + ("" if self.converged else
+                         " (search stopped at the time budget)"))
         print(run_notice)
         print(self._schedule)
 
@@ -297,14 +481,14 @@ class Scheduler(object):
 
             # Calculate baseline scenario for the current scenario timeseries... IN ONE LINE!
             baseline_scenario = pd.Series(
-                [ self.baseline_scenario[time.hour] for time in forecast.index],
-                index=forecast.index
+                [ self.baseline_scenario[time.hour] for time in self._forecast.index],
+                index=self._forecast.index
             )
 
             # Simulate baseline scenario
             elec_used, elec_imported, failure_time = self.simulator.run_simulation(
                 self.tank,
-                forecast,
+                self._forecast,
                 self._demand,
                 baseline_scenario,
                 self._surplus,
@@ -330,9 +514,371 @@ class Scheduler(object):
         if log_file:
             log_file.close()
 
-        # Now send the signal to the heatpump for the first hour
-        self._signal_heatpump(self._schedule.iloc[0], time)
+        return outcome
+
+
+    def _simulate_schedule(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Simulate the next 48 hours with the current schedule
+
+        Keeps the best schedule simulated so far. Raises SchedulerTimeout
+        instead of simulating if we're past the deadline (once we have at
+        least one outcome to fall back on).
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        if (self._deadline is not None and self._best is not None
+                and monotonic() > self._deadline):
+            raise SchedulerTimeout('Search time budget exhausted')
+
+        print("Running scenario: "
+              + str(self._schedule[self._schedule==1].size)
+              + "hours of heating")
+
+        outcome = self.simulator.run_simulation(
+            self.tank,
+            self._forecast,
+            self._demand,
+            self._schedule,
+            self._surplus,
+            log_file
+        )
+
+        if self._better_than_best(outcome):
+            self._best = (self._schedule.copy(), outcome)
+
+        return outcome
+
+
+    def _better_than_best(
+            self,
+            outcome: Tuple[float, float, Union[pd.Timestamp, bool]]
+        ) -> bool:
+        """Is this outcome better than the best one we've seen this search?
+
+        A schedule that meets the comfort criteria beats one that doesn't;
+        between two that do, the one importing less wins, and between two that
+        don't, the one that fails later.
+
+        Arguments:
+            outcome {tuple} -- electricity used, imported and failure time
+        """
+
+        if self._best is None:
+            return True
+
+        best_outcome = self._best[1]
+
+        if not outcome[2]:
+            return bool(best_outcome[2]) or outcome[1] < best_outcome[1]
+
+        return bool(best_outcome[2]) and outcome[2] > best_outcome[2]
+
+
+    def _greedy_search(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Find a schedule by adding the best hour before each failure in turn
 
+        Starting with no heating, adds the hour with the highest surplus before
+        the failure time until the comfort criteria are met or there are no
+        hours left. Returns the outcome of the final scenario.
+
+        The schedule is a bool array while we search, so adding an hour is
+        just indexing.
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        # 4. Generate scenario - at first 'no heating'
+        self._schedule = np.zeros(self._surplus.size, dtype=bool)
+
+        return self._climb(log_file)
+
+
+    def _climb(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Add hours to the current schedule until it meets comfort criteria
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        # Repeat until we have an outcome
+        while True:
+
+            # 5. Simulate next 48 hours with the current schedule
+            elec_used, elec_imported, failure_time = self._simulate_schedule(
+                log_file
+            )
+
+            # Two ways out of this endless loop - either we succeeded...
+            if not failure_time:
+                break
+
+            # ...or we ran out of hours to add heating in
+            print("Scenario has failed at ", str(failure_time))
+
+            # Repeat 4 - generate new schedule by adding an hour's heating
+            added_another_hour = self._add_hour(failure_time)
+
+            if not added_another_hour:
+                # We had no more hours to add - time to give up!
+                break
+
+        return elec_used, elec_imported, failure_time
+
+
+    def _warm_start_search(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Find a schedule starting from last hour's, shifted on by an hour
+
+        The problem barely changes from one hour to the next, so last hour's
+        schedule is usually still (nearly) right. If it no longer works, adds
+        hours as the greedy search does. Then prunes the lowest surplus hours
+        for as long as the schedule still works.
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        # Hours we've already had drop off the front, new ones at the end
+        # start off. We search on a bool array, as the greedy search does.
+        self._schedule = self._schedule.reindex(
+            self._surplus.index, fill_value=0
+        ).to_numpy(dtype=bool)
+
+        outcome = self._climb(log_file)
+
+        if outcome[2]:
+            # Nothing to prune - we ran out of hours
+            return outcome
+
+        # Try dropping hours, starting with the worst
+        pruning_order = [ position for position in self._hour_priority[::-1]
+                          if self._schedule[position] ]
+
+        for position in pruning_order:
+
+            self._schedule[position] = False
+
+            pruned_outcome = self._simulate_schedule(log_file)
+
+            if pruned_outcome[2]:
+                # We needed that one - put it back and stop here
+                print("Scenario has failed at ", str(pruned_outcome[2]))
+                self._schedule[position] = True
+                break
+
+            outcome = pruned_outcome
+
+        return outcome
+
+
+    def _bisect_search(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Find a schedule by bisecting on the number of hours of heating
+
+        Ranks the hours by surplus once, then bisects on how many of the top
+        ranked hours to turn on, so only O(log hours) scenarios are simulated.
+        This assumes more hours of heating never make things worse - if the
+        failure time ever comes earlier with more hours, or heating in every
+        hour still fails, falls back to the greedy search.
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        ranked_hours = self._surplus.index[self._hour_priority]
+
+        outcomes = {}
+
+        def try_hours(count):
+            # Heat in the top <count> hours
+            self._schedule = pd.Series(0, index=self._surplus.index)
+            self._schedule[ranked_hours[:count]] = 1
+
+            outcomes[count] = self._simulate_schedule(log_file)
+
+            if outcomes[count][2]:
+                print("Scenario has failed at ", str(outcomes[count][2]))
+
+            return outcomes[count][2]
+
+        # Perhaps we don't need any heating at all...
+        if not try_hours(0):
+            return outcomes[0]
+
+        # ...and perhaps heating won't help
+        if try_hours(ranked_hours.size):
+            return self._greedy_search(log_file)
+
+        # We know too few (low) and enough (high) hours. Close the gap.
+        low, high = 0, ranked_hours.size
+
+        while high - low > 1:
+            middle = (low + high) // 2
+
+            failure_time = try_hours(middle)
+
+            if not failure_time:
+                high = middle
+            elif failure_time < outcomes[low][2]:
+                # More heating made things worse - bisection won't work here
+                warnings.warn('Bisection assumption does not hold, using '
+                              + 'greedy search')
+                return self._greedy_search(log_file)
+            else:
+                low = middle
+
+        # Leave the schedule set to the one we've chosen
+        self._schedule = pd.Series(0, index=self._surplus.index)
+        self._schedule[ranked_hours[:high]] = 1
+
+        return outcomes[high]
+
+
+    def _milp_search(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Find a schedule with the linear programming planner
+
+        Simulates no heating first: if that fails, the stored energy the
+        planner's linear model has at the last hour we got through becomes its
+        comfort condition. Then plans the whole horizon in one solver call and
+        checks the plan with the full simulation. If it fails, plans again with
+        a bigger comfort margin; if it still fails (or can't be solved) falls
+        back to the greedy search.
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        # Perhaps we don't need any heating at all
+        self._schedule = pd.Series(0, index=self._surplus.index)
+
+        elec_used, elec_imported, failure_time = self._simulate_schedule(
+            log_file
+        )
+
+        if not failure_time:
+            return elec_used, elec_imported, failure_time
+
+        print("Scenario has failed at ", str(failure_time))
+
+        engine = planner.LinearPlanner(
+            self.tank,
+            self.heatpump,
+            self.simulator.minimum_temperature
+        )
+
+        failure_hour = self._forecast.index.get_loc(failure_time)
+
+        if failure_hour:
+            comfort_energy = engine.free_running_energy(
+                self._forecast, self._demand
+            )[failure_hour-1]
+        else:
+            comfort_energy = float(self.tank.energy_stored())
+
+        return self._check_plans(
+            lambda margin: engine.plan(
+                self._forecast,
+                self._demand,
+                self._surplus,
+                comfort_energy,
+                margin
+            ),
+            engine,
+            log_file
+        )
+
+
+    def _dp_search(
+            self,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Find a schedule with the dynamic programming planner
+
+        Plans the whole horizon over binned tank energy and checks the plan
+        with the full simulation. If it fails, plans again with a bigger
+        comfort margin; if it still fails (or there's no feasible plan) falls
+        back to the greedy search.
+
+        Arguments:
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        engine = planner.DynamicPlanner(self.tank, self.simulator)
+
+        return self._check_plans(
+            lambda margin: engine.plan(
+                self._forecast,
+                self._demand,
+                self._surplus,
+                margin
+            ),
+            engine,
+            log_file
+        )
+
+
+    def _check_plans(
+            self,
+            make_plan,
+            engine,
+            log_file = None
+        ) -> Tuple[float, float, Union[pd.Timestamp, bool]]:
+        """Simulate a planning engine's schedules until one works
+
+        Each failed plan is replaced by one with a bigger comfort margin, up to
+        the engine's number of attempts, before falling back to the greedy
+        search.
+
+        Arguments:
+            make_plan {callable} -- takes a comfort margin, returns a schedule
+            engine {object} -- the planner (for comfort_margin, margin_step
+                and attempts)
+            log_file {typing.TextIO} -- the (open) file to log to (optional)
+        """
+
+        margin = engine.comfort_margin
+
+        for attempt in range(engine.attempts):
+
+            try:
+                self._schedule = make_plan(margin)
+            except planner.PlannerError as err:
+                warnings.warn(str(err) + ', using greedy search')
+                return self._greedy_search(log_file)
+
+            elec_used, elec_imported, failure_time = self._simulate_schedule(
+                log_file
+            )
+
+            if not failure_time:
+                return elec_used, elec_imported, failure_time
+
+            print("Scenario has failed at ", str(failure_time))
+
+            margin += engine.margin_step
+
+        warnings.warn('Planned schedule failed in simulation, using greedy search')
+
+        return self._greedy_search(log_file)
 
 
     def _add_hour(
@@ -342,35 +888,28 @@ class Scheduler(object):
         """Add an hour to the schedule that isn't already in it.
 
         Looks for the hour with the highest surplus before the current failure
-        time that isn't in the schedule already. Returns True on success, False
-        if there are no more hours to add.
+        time that isn't in the schedule already. Returns the hour added on
+        success, False if there are no more hours to add.
 
         Arguments:
-            priority_hours {pd.Series} -- Descending sorted
+            failure_time {pd.Timestamp} -- the time the schedule fails
         """
 
-        # Order our surplus descendingly
-        priority_hours = self._surplus.truncate(
-            after=failure_time
-        ).sort_values(
-            ascending = False
-        ).index.to_series(
-            keep_tz = True
-        )
-
-        # Get a list of 'on' hours:
-        on_hours = self._schedule[self._schedule==1].index.to_series(
-            keep_tz = True
-        )
+        # Hours we could add: not already on, and no later than the failure
+        available = ~self._schedule[self._hour_priority]
 
-        remaining_hours = priority_hours[~priority_hours.isin(on_hours)]
+        if failure_time is not None:
+            failure_position = np.searchsorted(
+                self._hour_times, failure_time.to_datetime64()
+            )
+            available &= self._hour_priority <= failure_position
 
-        if remaining_hours.size == 0:
+        if not available.any():
             return False
 
-        # Find our highest priority hour that isn't in the on_hours series.
-        to_add = remaining_hours.iloc[0]
+        # Find our highest priority hour that isn't on already
+        to_add = self._hour_priority[available.argmax()]
 
-        self._schedule[to_add] = 1
+        self._schedule[to_add] = True
 
-        return to_add
+        return self._surplus.index[to_add]
@@ -0,0 +1,250 @@
+# Columnar, memory-mapped archive of hourly weather for long simulations
+from .forecast import ForecastProvider, ForecastException
+from .forecast import read_forecast, saved_forecasts
+import numpy as np
+import pandas as pd
+import os
+from typing import Tuple
+
+
+class ForecastArchive(ForecastProvider):
+    """Hourly weather for a site, stored by column in one file per year
+
+    Each year is a .npy file holding a (fields x hours) float array, with
+    hours counted from the start of the year in UTC and NaN for hours we
+    don't have. Files are memory-mapped, so a 48 hour window is a view onto
+    the file rather than a copy (unless it spans the new year).
+
+    Can be used as a forecast provider for replaying history.
+    """
+
+    # The hourly fields we keep, in the order they're stored
+    fields = ['temperature', 'windSpeed', 'pressure', 'windBearing',
+              'cloudCover', 'daily_average']
+
+    # Hours after the start hour that get_forecast serves
+    horizon = 48
+
+    def __init__(
+        self, directory, latitude = 57.6568, longitude = -3.5818, tz='Europe/London'
+    ):
+        """Open (or start) a site's archive
+
+        Arguments:
+            directory {string} -- directory holding the archive files
+            latitude {float or string} -- latitude
+            longitude {float or string} -- longitude
+            tz {string} -- timezone for the forecasts served
+        """
+
+        self.directory = directory
+        self.latitude = latitude
+        self.longitude = longitude
+        self.tz = tz
+
+        # Years' hours and arrays we've opened so far (None if there's no
+        # file)
+        self._years = {}
+
+        self._columns = pd.Index(self.fields)
+
+
+    def _filename(self, year: int) -> str:
+        """Get the file holding a year
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        return os.path.join(
+            self.directory,
+            f'archive-{self.latitude},{self.longitude}-{year}.npy'
+        )
+
+
+    def _year_start(self, year: int) -> pd.Timestamp:
+        """Get the first hour of a year
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        return pd.Timestamp(year=year, month=1, day=1, tz='UTC')
+
+
+    def _year(self, year: int) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """Get a year's hours and array, memory-mapped read only
+
+        Returns None if we have nothing for that year.
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        if year not in self._years:
+            filename = self._filename(year)
+
+            if os.path.exists(filename):
+                values = np.load(filename, mmap_mode='r')
+                index = pd.date_range(
+                    self._year_start(year), periods=values.shape[1],
+                    freq='h', name='datetime'
+                ).tz_convert(self.tz)
+
+                self._years[year] = (index, values)
+            else:
+                self._years[year] = None
+
+        return self._years[year]
+
+
+    def window(
+            self,
+            start_time: pd.Timestamp
+        ) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        """Get the hours and (fields x hours) array for the horizon from an hour
+
+        Stops early at the first hour we have no data for.
+
+        Arguments:
+            start_time {pd.Timestamp} -- the first hour
+        """
+
+        hour = start_time.tz_convert('UTC').floor('h')
+        hours = self.horizon + 1
+
+        indexes = []
+        parts = []
+
+        while hours > 0:
+            year = self._year(hour.year)
+
+            if year is None:
+                break
+
+            index, values = year
+
+            first = (hour.value - index[0].value) // 3600_000_000_000
+
+            indexes.append(index[first:first + hours])
+            parts.append(values[:, first:first + hours])
+
+            hours -= parts[-1].shape[1]
+            hour = self._year_start(hour.year + 1)
+
+        if not parts:
+            raise ForecastException(f'No weather archived for {start_time}')
+
+        if len(parts) == 1:
+            index, values = indexes[0], parts[0]
+        else:
+            index, values = indexes[0].append(indexes[1:]), np.hstack(parts)
+
+        # Stop at the first gap
+        missing = np.isnan(values[0])
+
+        if missing.any():
+            index, values = index[:missing.argmax()], values[:, :missing.argmax()]
+
+        if not index.size:
+            raise ForecastException(f'No weather archived for {start_time}')
+
+        return index, values
+
+
+    def get_forecast(
+            self,
+            sim_start_time: pd.Timestamp = None,
+            fresh: bool = False
+        ) -> pd.DataFrame:
+        """Get 48 hour forecast from the archive
+
+        The DataFrame is a read only view onto the archive.
+
+        Arguments:
+            sim_start_time {pd.Timestamp} -- simulation start time; if not
+                supplied start time is the current hour.
+            fresh {bool} -- ignored, as the archive never changes
+        """
+
+        index, values = self.window(
+            sim_start_time or pd.Timestamp.now(tz=self.tz)
+        )
+
+        return pd.DataFrame(
+            values.T, index=index, columns=self._columns, copy=False
+        )
+
+
+    def add(self, weather: pd.DataFrame):
+        """Write hourly weather into the archive
+
+        Overwrites any hours already there. Fields we don't store are
+        ignored; daily averages are worked out if they're missing.
+
+        Arguments:
+            weather {pd.DataFrame} -- hourly weather with a timezone aware
+                index
+        """
+
+        weather = weather.sort_index()
+
+        if 'daily_average' not in weather:
+            weather = weather.assign(daily_average=weather.groupby(
+                weather.index.tz_convert(self.tz).date
+            )['temperature'].transform('mean'))
+
+        weather = weather.reindex(columns=self.fields)
+        weather.index = weather.index.tz_convert('UTC')
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        for year, year_weather in weather.groupby(weather.index.year):
+
+            filename = self._filename(year)
+
+            # Let go of our read only map before we write
+            self._years.pop(year, None)
+
+            if os.path.exists(filename):
+                stored = np.load(filename, mmap_mode='r+')
+            else:
+                hours = int((self._year_start(year + 1) - self._year_start(year))
+                            // pd.Timedelta(hours=1))
+                stored = np.lib.format.open_memmap(
+                    filename, mode='w+', dtype=float,
+                    shape=(len(self.fields), hours)
+                )
+                stored[:] = np.nan
+
+            positions = ((year_weather.index - self._year_start(year))
+                         // pd.Timedelta(hours=1))
+
+            stored[:, positions] = year_weather.to_numpy(dtype=float).T
+            stored.flush()
+
+            del stored
+
+
+    def import_forecasts(self, directory: str):
+        """Import forecasts saved by the Forecaster
+
+        Each hour is taken from the latest forecast that covers it.
+
+        Arguments:
+            directory {string} -- directory of saved forecasts
+        """
+
+        files = saved_forecasts(
+            directory, self.latitude, self.longitude, self.tz
+        )
+
+        if files.empty:
+            return
+
+        forecasts = pd.concat(
+            [ read_forecast(filename, self.tz) for filename in files ]
+        )
+
+        # The forecasts are in the order they were made, so keep the last
+        self.add(forecasts.groupby(level=0).last())
@@ -0,0 +1,306 @@
+# Hourly control loop around the Scheduler, on an asyncio event loop
+from concurrent.futures import ThreadPoolExecutor
+from .fleet import _plan_site, _previous_schedule
+import asyncio
+import functools
+import inspect
+import time
+import warnings
+import pandas as pd
+from typing import Callable
+
+
+class ControlLoop(object):
+    """Runs a Scheduler on the hour, every hour
+
+    Planning runs in an executor (a single worker thread by default, or pass
+    e.g. a ProcessPoolExecutor) so the event loop stays free for I/O. The
+    forecast for the next hour is fetched while the current hour is being
+    planned, and heat pump signals are sent without holding up the loop.
+
+    The Scheduler should be created with plan_on_init=False. If given a
+    start_time the loop replays from then without waiting for the clock.
+
+    A failure in any one hour doesn't stop the loop: a forecast that can't
+    be used is replaced by the previous one, and if planning fails the heat
+    pump carries on with what's left of the previous hour's schedule.
+    """
+
+    # Seconds before the hour to start getting its forecast
+    prefetch_lead = 300
+
+    # Seconds to wait at the hour for a forecast that hasn't arrived yet
+    forecast_timeout = 120
+
+
+    def __init__(
+            self,
+            scheduler,
+            executor = None,
+            signal: Callable = None,
+            start_time: pd.Timestamp = None
+        ):
+        """Set up the loop
+
+        Arguments:
+            scheduler {Scheduler} -- the scheduler to run
+            executor {concurrent.futures.Executor} -- where to plan (optional)
+            signal {callable} -- function or coroutine function taking
+                (active, time) to send the heat pump its signal (defaults to
+                the Scheduler's own)
+            start_time {pd.Timestamp} -- first hour, if replaying historical
+                data (optional)
+        """
+
+        self.scheduler = scheduler
+        self.signal = signal or scheduler._signal_heatpump
+        self.start_time = start_time
+
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+
+        # Forecast requests and blocking signals go here
+        self._io_executor = ThreadPoolExecutor(max_workers=2)
+
+        # Signals still being sent
+        self._signals = set()
+
+        self.outcome = None
+
+
+    async def run(self, hours: int = None):
+        """Plan and signal every hour
+
+        Arguments:
+            hours {int} -- number of hours to run for (optional, forever if
+                not given)
+        """
+
+        tick = (self.start_time or pd.Timestamp.now(tz=self.scheduler.tz)).floor('h')
+
+        prefetch = asyncio.ensure_future(self._fetch_forecast(tick))
+
+        try:
+            while hours is None or hours > 0:
+
+                await self._wait_until(tick)
+
+                forecast, fetched = await self._collect_forecast(prefetch, tick)
+
+                # Get the next forecast while we plan this hour
+                next_tick = tick + pd.Timedelta(hours=1)
+                prefetch = asyncio.ensure_future(self._prefetch(next_tick))
+
+                await self._run_hour(tick, forecast, fetched)
+
+                tick = next_tick
+
+                if hours is not None:
+                    hours -= 1
+
+        finally:
+            prefetch.cancel()
+
+            # Let any signals still on their way get there
+            if self._signals:
+                await asyncio.wait(self._signals)
+
+
+    async def _run_hour(
+            self,
+            tick: pd.Timestamp,
+            forecast: pd.DataFrame,
+            fetched: float = None
+        ):
+        """Plan this hour and signal the heat pump
+
+        Arguments:
+            tick {pd.Timestamp} -- the hour we're planning
+            forecast {pd.DataFrame} -- its forecast (None if we haven't got one)
+            fetched {float} -- when the forecast was fetched (seconds since the
+                epoch, None if we don't know)
+        """
+
+        loop = asyncio.get_running_loop()
+
+        # To fall back on, as planning in a thread replaces it as it goes
+        previous = self.scheduler._schedule
+
+        try:
+            await loop.run_in_executor(
+                self._io_executor, self._prepare, forecast, fetched
+            )
+
+            schedule, self.outcome, converged = await loop.run_in_executor(
+                self.executor, _plan_site, self.scheduler, tick,
+                self.scheduler.time_budget
+            )
+
+        except Exception as err:
+            warnings.warn(f'Could not plan for {tick}: {err}')
+
+            schedule = _previous_schedule(previous, tick)
+            converged = False
+
+            if schedule is None:
+                warnings.warn(f'No schedule to fall back on for {tick}')
+                return
+
+        self.scheduler._schedule = schedule
+        self.scheduler.converged = converged
+
+        self._send_signal(schedule.iloc[0], tick)
+
+
+    def _prepare(self, forecast: pd.DataFrame, fetched: float = None):
+        """Bring the scheduler's forecast and surplus up to date
+
+        Arguments:
+            forecast {pd.DataFrame} -- this hour's forecast (None if we
+                haven't got one)
+            fetched {float} -- when it was fetched (seconds since the epoch,
+                None if we don't know)
+        """
+
+        if forecast is not None and not forecast.empty:
+            previous = (self.scheduler._forecast, self.scheduler.forecast_age)
+
+            try:
+                self.scheduler.update_forecast(
+                    forecast=forecast,
+                    forecast_age=None if fetched is None else time.time() - fetched
+                )
+                self.scheduler.predict_surplus()
+                return
+            except Exception as err:
+                warnings.warn(f'Could not use forecast: {err}')
+                self.scheduler._forecast, self.scheduler.forecast_age = previous
+
+        self.scheduler.reuse_forecast()
+        self.scheduler.predict_surplus()
+
+
+    def _send_signal(self, active, tick: pd.Timestamp):
+        """Send the heat pump its signal without waiting for it to arrive
+
+        Arguments:
+            active {bool} -- whether the heatpump is active or not
+            tick {pd.Timestamp} -- the time we're acting for
+        """
+
+        if inspect.iscoroutinefunction(self.signal):
+            sending = asyncio.ensure_future(self.signal(active, tick))
+        else:
+            sending = asyncio.get_running_loop().run_in_executor(
+                self._io_executor, self.signal, active, tick
+            )
+
+        self._signals.add(sending)
+        sending.add_done_callback(self._signal_sent)
+
+
+    def _signal_sent(self, sending: asyncio.Future):
+        """Tidy up after a signal, warning if it didn't get through
+
+        Arguments:
+            sending {asyncio.Future} -- the finished signal
+        """
+
+        self._signals.discard(sending)
+
+        if not sending.cancelled() and sending.exception():
+            warnings.warn('Heat pump signal failed: ' + str(sending.exception()))
+
+
+    async def _prefetch(self, tick: pd.Timestamp) -> tuple:
+        """Get the forecast for the coming hour shortly before it starts
+
+        Arguments:
+            tick {pd.Timestamp} -- the hour we want the forecast for
+        """
+
+        await self._wait_until(tick - pd.Timedelta(seconds=self.prefetch_lead))
+
+        return await self._fetch_forecast(tick)
+
+
+    async def _fetch_forecast(self, tick: pd.Timestamp) -> tuple:
+        """Get the forecast for an hour in the I/O executor
+
+        Returns the forecast and when it was fetched (seconds since the epoch,
+        None if the weatherman doesn't say how old it is).
+
+        Arguments:
+            tick {pd.Timestamp} -- the hour we want the forecast for
+        """
+
+        get_forecast = self.scheduler.weatherman.get_forecast
+
+        # Live forecasts are only ever for now, and we plan on a new one
+        # rather than whatever's cached, where the weatherman lets us
+        if 'fresh' in inspect.signature(get_forecast).parameters:
+            get_forecast = functools.partial(get_forecast, fresh=True)
+
+        def fetch():
+            forecast = get_forecast(tick if self.start_time else None)
+            age = getattr(self.scheduler.weatherman, 'forecast_age', None)
+
+            return forecast, None if age is None else time.time() - age
+
+        forecast, fetched = await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, fetch
+        )
+
+        # A live forecast fetched before the hour starts at the hour before
+        return forecast.truncate(before=tick), fetched
+
+
+    async def _collect_forecast(
+            self,
+            prefetch: asyncio.Future,
+            tick: pd.Timestamp
+        ) -> tuple:
+        """Wait (a while) for this hour's forecast
+
+        Returns it and when it was fetched, or Nones if it failed or didn't
+        turn up in time.
+
+        Arguments:
+            prefetch {asyncio.Future} -- the forecast on its way
+            tick {pd.Timestamp} -- the hour it's for
+        """
+
+        try:
+            return await asyncio.wait_for(prefetch, self.forecast_timeout)
+        except asyncio.TimeoutError:
+            warnings.warn(f'Forecast for {tick} did not arrive in time')
+        except Exception as err:
+            warnings.warn(f'Could not retrieve forecast for {tick}: {err}')
+
+        return None, None
+
+
+    async def _wait_until(self, time: pd.Timestamp):
+        """Sleep until the given time (unless we're replaying)
+
+        Arguments:
+            time {pd.Timestamp} -- when to wake up
+        """
+
+        if self.start_time:
+            return
+
+        delay = (time - pd.Timestamp.now(tz=time.tz)).total_seconds()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+    def close(self):
+        """Shut down the executors (the planning one only if it's ours)
+        """
+
+        if self._own_executor:
+            self.executor.shutdown()
+
+        self._io_executor.shutdown()
@@ -0,0 +1,280 @@
+# Scheduling several district heat networks together
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+from . import Scheduler
+import os
+import pickle
+import warnings
+import pandas as pd
+from typing import Union, Tuple
+
+
+class FleetError(Exception):
+    pass
+
+
+def _plan_site(
+        site: Scheduler,
+        start_time: pd.Timestamp = None,
+        time_budget: float = None
+    ) -> Tuple[pd.Series, Tuple[float, float, Union[pd.Timestamp, bool]], bool]:
+    """Plan one site's schedule - run in the worker processes
+
+    Returns the schedule, its outcome and whether the search converged.
+
+    Arguments:
+        site {Scheduler} -- the site, with its forecast and surplus up to date
+        start_time {pd.Timestamp} -- start time if running on historical data
+        time_budget {float} -- seconds the search may take (optional)
+    """
+
+    outcome = site.plan(start_time, time_budget)
+
+    return site._schedule, outcome, site.converged
+
+
+def _previous_schedule(schedule, tick: pd.Timestamp) -> pd.Series:
+    """Get what's left of a site's last schedule from an hour on
+
+    Returns None if there's nothing left of it.
+
+    Arguments:
+        schedule {pd.Series} -- the site's last schedule
+        tick {pd.Timestamp} -- the hour being planned
+    """
+
+    if not isinstance(schedule, pd.Series):
+        return None
+
+    schedule = schedule[schedule.index >= tick]
+
+    return schedule if not schedule.empty else None
+
+
+class Fleet(object):
+    """Schedules heat pump operation for several district heat networks
+
+    Should be instantiated with a list of sites, each a dict of the keyword
+    arguments for its Scheduler plus an optional 'name'. Sites at the same
+    location share one forecast and sites with the same renewables (and
+    reserved wind power) share one generation model and prediction. A site
+    can bring its own weatherman (e.g. a ReplayForecaster) or renewables
+    model, which it shares with any other sites given the same one. The
+    searches for each hour's schedules are spread over a process pool.
+    """
+
+    # Sites' keyword arguments that decide what they can share
+    _location_keys = ['latitude', 'longitude', 'tz']
+    _renewables_keys = ['altitude', 'pv_arrays', 'wind_farm',
+                        'roughness_length', 'hellman_exp']
+
+
+    def __init__(
+            self,
+            sites: list,
+            processes: int = None,
+            time_budget: float = None
+        ):
+        """Set up a scheduler for each site and the process pool
+
+        Arguments:
+            sites {list} -- list of dicts of Scheduler keyword arguments, each
+                with an optional 'name' (defaults to its position)
+            processes {int} -- number of worker processes (defaults to one per
+                core, 0 plans in this process)
+            time_budget {float} -- seconds each hour's planning may take in
+                total (optional)
+        """
+
+        self.time_budget = time_budget
+
+        # Sites planned at once (for sharing out the time budget)
+        self._workers = (
+            (os.cpu_count() or 1) if processes is None else max(processes, 1)
+        )
+
+        # Work out who shares what before the Schedulers get to them (the
+        # renewables model adds to the PV array dicts)
+        configs = []
+        weathermen = {}
+        renewables_models = {}
+
+        for number, site in enumerate(sites):
+            config = dict(site)
+            name = str(config.pop('name', number))
+
+            # Sites' own weathermen and renewables models are only shared
+            # with sites given the same one
+            weatherman = config.pop('weatherman', None)
+            renewables_model = config.pop('renewables', None)
+
+            place = tuple(self._setting(config, key)
+                          for key in self._location_keys)
+            location = place + (id(weatherman), ) if weatherman else place
+
+            if renewables_model:
+                renewables = ('renewables', id(renewables_model))
+            else:
+                renewables = pickle.dumps(
+                    [ place ]
+                    + [ self._setting(config, key) for key in self._renewables_keys ]
+                )
+            generation = (renewables, self._setting(config, 'reserved_wind_power'))
+
+            configs.append((name, config, location, renewables, generation))
+            weathermen.setdefault(location, weatherman)
+            renewables_models.setdefault(renewables, renewables_model)
+
+        self.sites = {}
+        self._locations = {}
+        self._generations = {}
+
+        for name, config, location, renewables, generation in configs:
+
+            if name in self.sites:
+                raise FleetError('Duplicate site name: ' + name)
+
+            site = Scheduler(
+                weatherman = weathermen.get(location),
+                renewables = renewables_models.get(renewables),
+                plan_on_init = False,
+                **config
+            )
+
+            weathermen[location] = site.weatherman
+            renewables_models[renewables] = site.renewables
+
+            self.sites[name] = site
+            self._locations[name] = location
+            self._generations[name] = generation
+
+        self.outcomes = {}
+
+        self._executor = (
+            ProcessPoolExecutor(max_workers=processes) if processes != 0
+            else None
+        )
+
+
+    def _setting(self, config: dict, key: str):
+        """Get a site's setting as its Scheduler will see it
+
+        Arguments:
+            config {dict} -- the site's keyword arguments
+            key {string} -- the setting
+        """
+
+        return config.get(key) or getattr(Scheduler, key)
+
+
+    def run_model(
+            self,
+            start_time: pd.Timestamp = None,
+            time_budget: float = None
+        ) -> dict:
+        """Create every site's schedule for this hour
+
+        Gets one forecast per location and one generation prediction per set of
+        renewables, then plans the sites in the process pool and signals their
+        heat pumps. Returns the schedules by site name.
+
+        A site that can't be planned falls back on what's left of its last
+        schedule, with a warning, and doesn't hold up the others.
+
+        The time budget is shared out so that the sites waiting for a worker
+        are planned in time too: each site gets the time left divided by the
+        number of rounds of planning the workers have to do.
+
+        Arguments:
+            start_time {pd.Timestamp} -- start time if running on historical
+                data or a future time within current data set
+            time_budget {float} -- seconds allowed, counted from now (defaults
+                to the time_budget attribute)
+        """
+
+        if time_budget is None:
+            time_budget = self.time_budget
+
+        started = monotonic()
+
+        forecasts = {}
+        generations = {}
+
+        for name, site in self.sites.items():
+
+            location = self._locations[name]
+            site.update_forecast(start_time, *forecasts.get(location, (None, None)))
+            forecasts[location] = (site._forecast, site.forecast_age)
+
+            generation = self._generations[name]
+            site.predict_surplus(generations.get(generation))
+            generations[generation] = site.generation
+
+        sites = list(self.sites.values())
+
+        # To fall back on, as planning here replaces them as it goes
+        previous = [ site._schedule for site in sites ]
+
+        if time_budget is not None:
+            rounds = -(-len(sites) // self._workers)
+            time_budget = max(time_budget - (monotonic() - started), 0) / rounds
+
+        if self._executor:
+            results = [
+                self._executor.submit(_plan_site, site, start_time, time_budget)
+                for site in sites
+            ]
+        else:
+            results = [ None ] * len(sites)
+
+        schedules = {}
+
+        for (name, site), result, last in zip(
+                self.sites.items(), results, previous):
+
+            tick = start_time or pd.Timestamp.now(tz=site.tz)
+
+            try:
+                schedule, outcome, converged = (
+                    result.result() if result
+                    else _plan_site(site, start_time, time_budget)
+                )
+            except Exception as err:
+                warnings.warn(f'Could not plan {name} for {tick}: {err}')
+
+                schedule = _previous_schedule(last, tick.floor('h'))
+                outcome = None
+                converged = False
+
+                if schedule is None:
+                    warnings.warn(f'No schedule for {name} to fall back on')
+                    continue
+
+            site._schedule = schedule
+            site.converged = converged
+            self.outcomes[name] = outcome
+            schedules[name] = schedule
+
+            try:
+                site._signal_heatpump(schedule.iloc[0], tick)
+            except Exception as err:
+                warnings.warn(f'Could not signal {name}\'s heat pump: {err}')
+
+        return schedules
+
+
+    def close(self):
+        """Shut down the process pool
+        """
+
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
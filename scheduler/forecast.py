@@ -1,7 +1,12 @@
 import pandas as pd
 import requests
 import os
+import re
 import time
+import threading
+import warnings
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from requests.exceptions import HTTPError
 
 
@@ -9,14 +14,142 @@ class ForecastException(Exception):
     pass
 
 
-class Forecaster(object):
+def read_forecast(filename: str, tz: str) -> pd.DataFrame:
+    """Read a forecast saved as CSV
+
+    Arguments:
+        filename {string} -- the file
+        tz {string} -- timezone to give the index
+    """
+
+    forecast = pd.read_csv(filename, index_col='datetime')
+    forecast.index = pd.to_datetime(
+        forecast.index, utc=True
+    ).tz_convert(tz)
+
+    return forecast
+
+
+def saved_forecasts(
+        directory: str,
+        latitude: float,
+        longitude: float,
+        tz: str
+    ) -> pd.Series:
+    """Find the forecasts saved in a directory for a location
+
+    Returns the filenames indexed by the hour they start at, in order. Files
+    saved without a location are taken to be for this one.
+
+    Arguments:
+        directory {string} -- directory of saved forecasts
+        latitude {float or string} -- latitude
+        longitude {float or string} -- longitude
+        tz {string} -- timezone the files were saved in
+    """
+
+    pattern = re.compile(
+        r'forecast-(?:(?P<location>.+)-)?'
+        + r'(?P<hour>\d{4}-\d{2}-\d{2}-\d{4})\.csv$'
+    )
+    location = f'{latitude},{longitude}'
+
+    hours = []
+    filenames = []
+
+    for filename in os.listdir(directory):
+        match = pattern.match(filename)
+
+        if not match or match.group('location') not in (None, location):
+            continue
+
+        hours.append(match.group('hour'))
+        filenames.append(os.path.join(directory, filename))
+
+    index = pd.to_datetime(
+        pd.Series(hours, dtype=str), format='%Y-%m-%d-%H%M'
+    ).dt.tz_localize(tz, ambiguous='NaT', nonexistent='NaT')
+
+    files = pd.Series(filenames, index=pd.DatetimeIndex(index))
+
+    return files[files.index.notna()].sort_index()
+
+
+class ForecastProvider(object):
+    """Anything the Scheduler can get its forecasts from
+
+    get_forecast should return hourly weather with a timezone aware index,
+    from the start of the hour to 48 hours later: the DarkSky fields
+    (temperature, windSpeed, pressure, windBearing, cloudCover) and the
+    daily_average temperature. With fresh set a live forecast shouldn't
+    come from anything cached.
+    """
+
+    tz = 'Europe/London'
+
+    def get_forecast(
+            self,
+            sim_start_time: pd.Timestamp = None,
+            fresh: bool = False
+        ) -> pd.DataFrame:
+        """Get 48 hour forecast
+
+        Arguments:
+            sim_start_time {pd.Timestamp} -- simulation start time; if not
+                supplied start time is the current hour.
+            fresh {bool} -- get a new live forecast rather than a cached one
+        """
+
+        raise NotImplementedError
+
+
+class Forecaster(ForecastProvider):
     """Class for interacting with the DarkSky forecast API.
 
     For details on the API see
+
+    Forecasts are cached by location and hour: the most recent ones in memory
+    and all of them on disk. Live forecasts expire from the cache after
+    cache_ttl seconds; historical ones never change so never expire.
+
+    Live forecasts are served from the latest one we have (from the hour on)
+    rather than waiting for DarkSky: if it's stale a new one is fetched in
+    the background for next time. start_refreshing() keeps it fresh by
+    fetching shortly before every hour. forecast_age is the age in seconds
+    of the forecast last served. Ask for a fresh forecast where it matters,
+    such as when planning.
+
+    It's safe to use from several threads at once.
     """
 
+    # Where forecasts are saved, and how long a live one stays fresh (seconds)
+    cache_dir = 'forecasts'
+    cache_ttl = 3600
+
+    # How many forecasts to keep in memory
+    cache_size = 72
+
+    # Serve the latest live forecast while refreshing a stale one, unless
+    # it's older than max_stale (seconds)
+    serve_stale = True
+    max_stale = 6 * 3600
+
+    # Seconds before the hour that start_refreshing() gets a new forecast
+    refresh_lead = 300
+
+    # Age (seconds) of the forecast we served last
+    forecast_age = None
+
+    # How many days of historical data to keep in memory
+    day_cache_size = 8
+
+    # Where to find the API, and how long to wait for it (seconds)
+    api_url = 'https://api.darksky.net/forecast/'
+    request_timeout = 30
+
     def __init__(
-        self, API_key, latitude = 57.6568, longitude = -3.5818, tz='Europe/London'
+        self, API_key, latitude = 57.6568, longitude = -3.5818, tz='Europe/London',
+        cache_dir = None, cache_ttl = None, cache_size = None
     ):
         """Instantiate class with API key and lat/long (if used somewhere other
         than Findhorn)
@@ -25,11 +158,47 @@ class Forecaster(object):
             API_key {string} -- active API key for communicating with DarkSky
             latitude {float or string} -- latitude
             longitude {float or string} -- longitude
+            cache_dir {string} -- directory to save forecasts in (optional)
+            cache_ttl {float} -- seconds a live forecast stays fresh (optional)
+            cache_size {int} -- forecasts to keep in memory (optional)
         """
 
         self._API_key = API_key
         self.tz = tz
 
+        if cache_dir:
+            self.cache_dir = cache_dir
+
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
+
+        if cache_size is not None:
+            self.cache_size = cache_size
+
+        # Guards the caches, the latest forecast and the sessions
+        self._lock = threading.Lock()
+
+        # Most recently used last: (location, hour) -> (time fetched, forecast)
+        self._cache = OrderedDict()
+
+        # Counts of 'memory_hits', 'disk_hits' and 'misses'
+        self.cache_stats = Counter()
+
+        # Historical days' hourly data, most recently used last
+        self._days = OrderedDict()
+
+        # Sessions not in use, so connections get reused
+        self._sessions = []
+
+        # The latest live forecast: (time fetched, forecast)
+        self._latest = None
+
+        # Background refreshes
+        self._refresh_lock = threading.Lock()
+        self._refreshing = None
+        self._refresher = None
+        self._stop_refreshing = threading.Event()
+
         if latitude:
             self.latitude = latitude
 
@@ -38,147 +207,280 @@ class Forecaster(object):
 
 
 
-    def get_forecast(self, sim_start_time: pd.Timestamp = None) -> pd.DataFrame:
+    def get_forecast(
+            self,
+            sim_start_time: pd.Timestamp = None,
+            fresh: bool = False
+        ) -> pd.DataFrame:
         """Get 48 hour forecast
 
         Combine API calls to DarkSky to make one DataFrame with
         meteorological data starting at the start of today and ending 48 hours
         time. If a start_time is supplied works from the start of that day
-        to 48 hours after start_time
+        to 48 hours after start_time. Uses the cache if we have it, unless
+        we're asked for a fresh live forecast.
 
         Arguments:
             sim_start_time {pd.Timestamp} -- simulation start time; if not
                 supplied start time is the current hour.
+            fresh {bool} -- get a new live forecast rather than a cached one
         """
 
-        # First up - check we haven't already pulled one this hour
-
         start_time = sim_start_time or pd.Timestamp.now(tz=self.tz)
 
         # We can't get a forecast for a date in the future
         if (start_time>pd.Timestamp.now(tz=self.tz)):
             raise ForecastException('Cannot get forecast for future date')
 
-        start_time = start_time.replace(minute=0, second=0)
+        start_time = start_time.replace(
+            minute=0, second=0, microsecond=0, nanosecond=0
+        )
+
+        key = (self.latitude, self.longitude, start_time)
+        live = sim_start_time is None
+
+        cached = None
+
+        if not (live and fresh):
+            # Any recent enough live forecast beats waiting for a new one
+            cached = self._latest_forecast(start_time) if live else None
+
+            # Otherwise check we haven't already pulled one this hour
+            if cached is None:
+                cached = self._cached_forecast(key, live)
+
+        if cached is None:
+            with self._lock:
+                self.cache_stats['misses'] += 1
+
+            forecast = self._fetch_forecast(start_time, sim_start_time)
+            cached = (time.time(), forecast)
 
-        filename = ('forecasts/forecast-'
-                    + start_time.strftime('%Y-%m-%d-%H%M')
-                    + '.csv')
+            self._remember(key, *cached)
+            self._save_forecast(key, cached[1])
 
-        if os.path.exists(filename):
-            forecast = pd.read_csv(
-                filename,
-                index_col='datetime',
-                parse_dates=['datetime'],
-                dayfirst = True
+        fetched, forecast = cached
+
+        if live:
+            self._keep_latest(*cached)
+
+        self.forecast_age = time.time() - fetched
+
+        return forecast.copy()
+
+
+    def _latest_forecast(self, start_time: pd.Timestamp) -> tuple:
+        """Get the latest live forecast from the hour on, even if stale
+
+        If it's stale, starts getting a new one in the background. Returns
+        the time it was fetched and the forecast, or None if we've nothing
+        recent enough to use.
+
+        Arguments:
+            start_time {pd.Timestamp} -- the hour the forecast starts
+        """
+
+        with self._lock:
+            latest = self._latest
+
+        if not self.serve_stale or latest is None:
+            return None
+
+        fetched, forecast = latest
+        age = time.time() - fetched
+
+        if age > self.max_stale:
+            return None
+
+        forecast = forecast.truncate(before=start_time)
+
+        if forecast.empty:
+            return None
+
+        stale = age > self.cache_ttl
+
+        with self._lock:
+            self.cache_stats['stale_hits' if stale else 'memory_hits'] += 1
+
+        if stale:
+            self.refresh()
+
+        return fetched, forecast
+
+
+    def _keep_latest(self, fetched: float, forecast: pd.DataFrame):
+        """Keep a live forecast as the latest, unless we've a newer one
+
+        Arguments:
+            fetched {float} -- when it was fetched (seconds since the epoch)
+            forecast {pd.DataFrame} -- the forecast
+        """
+
+        with self._lock:
+            if self._latest is None or fetched > self._latest[0]:
+                self._latest = (fetched, forecast)
+
+
+    def refresh(self):
+        """Get a new live forecast in the background
+
+        Does nothing if we're already getting one.
+        """
+
+        with self._refresh_lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+
+            self._refreshing = threading.Thread(
+                target=self._refresh, daemon=True
             )
+            self._refreshing.start()
+
 
-        # First call - start of today until end of tomorrow
-        unixtime = int(time.mktime(start_time.timetuple()))
+    def _refresh(self):
+        """Get a new live forecast, keeping it as the latest
+        """
+
+        start_time = pd.Timestamp.now(tz=self.tz).replace(
+            minute=0, second=0, microsecond=0, nanosecond=0
+        )
 
         try:
-            json_response = self._call_darksky(str(unixtime))
+            forecast = self._fetch_forecast(start_time)
         except Exception as err:
-            raise ForecastException(f'Communication error occurred: {err}')
+            warnings.warn(f'Could not refresh forecast: {err}')
+            return
 
-        past_data = pd.DataFrame.from_dict(json_response['hourly']['data'])
+        self._keep_latest(time.time(), forecast)
 
-        past_data['datetime'] = pd.to_datetime(
-            past_data['time'],
-            unit = 's'
-        )
-        past_data.set_index(
-            'datetime',
-            inplace = True
+        self._save_forecast((self.latitude, self.longitude, start_time), forecast)
+
+
+    def start_refreshing(self):
+        """Refresh the live forecast refresh_lead seconds before every hour
+        """
+
+        if self._refresher is not None:
+            return
+
+        self._stop_refreshing.clear()
+        self._refresher = threading.Thread(
+            target=self._refresh_hourly, daemon=True
         )
-        past_data.index = past_data.index.tz_localize('UTC').tz_convert(self.tz)
+        self._refresher.start()
 
-        # Second call - might be another historical one...
-        if not sim_start_time:
 
-            # No, this is the standard forecast
-            try:
-                json_response = self._call_darksky()
-            except Exception as err:
-                raise ForecastException(f'Communication error occurred: {err}')
+    def stop_refreshing(self):
+        """Stop refreshing the live forecast every hour
+        """
 
-            # We have to do this differently for historic data as the DarkSky
-            # API doesn't appear to be returning 2 day forecasts for historical
-            # data as the docs indicate it should.
+        if self._refresher is None:
+            return
 
-            future_data = pd.DataFrame.from_dict(json_response['hourly']['data'])
-            future_data['datetime'] = pd.to_datetime(
-                future_data['time'],
-                unit = 's'
-            )
+        self._stop_refreshing.set()
+        self._refresher.join()
+        self._refresher = None
 
-            future_data.set_index(
-                'datetime',
-                inplace = True
-            )
 
-        else:
+    def _refresh_hourly(self):
+        """Refresh the live forecast before every hour until told to stop
+        """
 
-            # We need to do two more calls then.
-            # We'll trim it later.
+        lead = pd.Timedelta(seconds=self.refresh_lead)
 
-            second_day = (sim_start_time+pd.Timedelta(days=1))
+        while True:
+            now = pd.Timestamp.now(tz='UTC')
+            next_refresh = now.floor('h') + pd.Timedelta(hours=1) - lead
 
-            unixtime = int(time.mktime(second_day.timetuple()))
-            try:
-                json_response = self._call_darksky(str(unixtime))
-            except Exception as err:
-                raise ForecastException(f'Communication error occurred: {err}')
+            if next_refresh <= now:
+                next_refresh += pd.Timedelta(hours=1)
 
-            day_2_data = pd.DataFrame.from_dict(json_response['hourly']['data'])
-            day_2_data['datetime'] = pd.to_datetime(
-                day_2_data['time'],
-                unit = 's'
-            )
+            if self._stop_refreshing.wait((next_refresh - now).total_seconds()):
+                return
 
-            day_2_data.set_index(
-                'datetime',
-                inplace = True
-            )
+            self._refresh()
 
-            third_day =  (sim_start_time+pd.Timedelta(days=2))
 
-            unixtime = int(time.mktime(third_day.timetuple()))
-            try:
-                json_response = self._call_darksky(str(unixtime))
-            except Exception as err:
-                raise ForecastException(f'Communication error occurred: {err}')
+    def _fetch_forecast(
+            self,
+            start_time: pd.Timestamp,
+            sim_start_time: pd.Timestamp = None
+        ) -> pd.DataFrame:
+        """Get 48 hour forecast from DarkSky
 
-            day_3_data = pd.DataFrame.from_dict(json_response['hourly']['data'])
-            day_3_data['datetime'] = pd.to_datetime(
-                day_3_data['time'],
-                unit = 's'
-            )
+        The API calls we need go out together. Historical days are kept, so
+        working through consecutive hours needs about one new call per day.
 
-            day_3_data.set_index(
-                'datetime',
-                inplace = True
-            )
+        Arguments:
+            start_time {pd.Timestamp} -- the hour the forecast starts
+            sim_start_time {pd.Timestamp} -- simulation start time if running
+                on historical data
+        """
+
+        # We need the start of today until the end of tomorrow. DarkSky
+        # doesn't appear to return 2 day forecasts for historical data as the
+        # docs indicate it should, so for historical runs we need three days.
+        days = [ start_time.normalize() + pd.Timedelta(days=day)
+                 for day in range(3 if sim_start_time else 1) ]
+
+        calls = {}
 
-            future_data = day_2_data.combine_first(day_3_data)
+        with ThreadPoolExecutor(max_workers=len(days) + 1) as pool:
 
-        future_data.index = future_data.index.tz_localize('UTC').tz_convert(self.tz)
+            with self._lock:
+                known = [ day for day in days if self._day_key(day) in self._days ]
+
+            for day in days:
+                if day not in known:
+                    calls[day] = pool.submit(
+                        self._call_darksky, str(int(day.timestamp()))
+                    )
+
+            if not sim_start_time:
+                # This is the standard forecast
+                calls['forecast'] = pool.submit(self._call_darksky)
+
+            responses = {}
+
+            for call, response in calls.items():
+                try:
+                    responses[call] = self._hourly_data(response.result())
+                except Exception as err:
+                    raise ForecastException(f'Communication error occurred: {err}')
+
+        hourly_data = []
+
+        for day in days:
+            if day in responses:
+                self._remember_day(day, responses[day])
+                hourly_data.append(responses[day])
+            else:
+                hourly_data.append(self._known_day(day))
+
+        if not sim_start_time:
+            hourly_data.append(responses['forecast'])
+
+        past_data = hourly_data[0]
+        future_data = hourly_data[1]
+
+        if len(hourly_data) > 2:
+            future_data = future_data.combine_first(hourly_data[2])
 
         # Combine them together overwriting any rows that appear in both
         forecast = past_data.combine_first(future_data)
 
         # Add a daily average
-        forecast['daily_average'] = 0
+        forecast['daily_average'] = 0.
 
         # This only kicks in after today, so add today's in
         daily_average_col = forecast.columns.get_loc('daily_average')
-        forecast.iloc[0:24, daily_average_col] = forecast['temperature'][0:24].mean()
-        forecast.iloc[24:48, daily_average_col] = forecast['temperature'][24:48].mean()
+        forecast.iloc[0:24, daily_average_col] = forecast['temperature'].iloc[0:24].mean()
+        forecast.iloc[24:48, daily_average_col] = forecast['temperature'].iloc[24:48].mean()
 
         # Our data will be spanning 3 days. If we've used a forecast API call,
         # the last one will be incomplete so work that out on the average of
         # the last 24 hours in the forecast.
-        forecast.iloc[48:, daily_average_col] = forecast['temperature'][-24:].mean()
+        forecast.iloc[48:, daily_average_col] = forecast['temperature'].iloc[-24:].mean()
 
         # Truncate the second forecast at the 48 hour mark
         two_days_later = start_time+pd.Timedelta(days=2)
@@ -189,25 +491,192 @@ class Forecaster(object):
             before=start_time
         )
 
-        # Save our forecast to the local file that we looked for before
-        forecast.to_csv(filename, float_format='%.3f')
-
         return forecast
 
 
+    def _cache_filename(self, key: tuple) -> str:
+        """Get the file a forecast is saved in
+
+        Arguments:
+            key {tuple} -- latitude, longitude and hour of the forecast
+        """
+
+        latitude, longitude, start_time = key
+
+        return os.path.join(
+            self.cache_dir,
+            f'forecast-{latitude},{longitude}-'
+            + start_time.strftime('%Y-%m-%d-%H%M')
+            + '.csv'
+        )
+
+
+    def _cached_forecast(self, key: tuple, live: bool) -> tuple:
+        """Look for a forecast in memory, then on disk
+
+        Returns the time it was fetched and the forecast, or None if we don't
+        have it (or a live one has gone stale).
+
+        Arguments:
+            key {tuple} -- latitude, longitude and hour of the forecast
+            live {bool} -- whether it's a live forecast that may go stale
+        """
+
+        oldest = (time.time() - self.cache_ttl) if live else None
+
+        with self._lock:
+            if key in self._cache:
+                fetched, forecast = self._cache[key]
+
+                if oldest is None or fetched >= oldest:
+                    self._cache.move_to_end(key)
+                    self.cache_stats['memory_hits'] += 1
+                    return fetched, forecast
+
+                del self._cache[key]
+
+        filename = self._cache_filename(key)
+
+        if not os.path.exists(filename):
+            return None
+
+        fetched = os.path.getmtime(filename)
+
+        if oldest is not None and fetched < oldest:
+            return None
+
+        forecast = read_forecast(filename, self.tz)
+
+        self._remember(key, fetched, forecast)
+
+        with self._lock:
+            self.cache_stats['disk_hits'] += 1
+
+        return fetched, forecast
+
+
+    def _save_forecast(self, key: tuple, forecast: pd.DataFrame):
+        """Save a new forecast to disk
+
+        Arguments:
+            key {tuple} -- latitude, longitude and hour of the forecast
+            forecast {pd.DataFrame} -- the forecast
+        """
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Save our forecast to the local file we'll look for next time
+        forecast.to_csv(self._cache_filename(key), float_format='%.3f')
+
+
+    def _remember(self, key: tuple, fetched: float, forecast: pd.DataFrame):
+        """Keep a forecast in memory, forgetting the least recently used
+
+        Arguments:
+            key {tuple} -- latitude, longitude and hour of the forecast
+            fetched {float} -- when it was fetched (seconds since the epoch)
+            forecast {pd.DataFrame} -- the forecast
+        """
+
+        with self._lock:
+            self._cache[key] = (fetched, forecast)
+            self._cache.move_to_end(key)
+
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+    def _hourly_data(self, json_response: dict) -> pd.DataFrame:
+        """Get the hourly data out of a DarkSky response
+
+        Arguments:
+            json_response {dict} -- the decoded response
+        """
+
+        hourly_data = pd.DataFrame.from_dict(json_response['hourly']['data'])
+
+        hourly_data['datetime'] = pd.to_datetime(
+            hourly_data['time'],
+            unit = 's'
+        )
+        hourly_data.set_index(
+            'datetime',
+            inplace = True
+        )
+        hourly_data.index = hourly_data.index.tz_localize('UTC').tz_convert(self.tz)
+
+        return hourly_data
+
+
+    def _day_key(self, day: pd.Timestamp) -> tuple:
+        """Key for a day's historical data
+
+        Arguments:
+            day {pd.Timestamp} -- midnight at the start of the day
+        """
+
+        return (self.latitude, self.longitude, day)
+
+
+    def _remember_day(self, day: pd.Timestamp, hourly_data: pd.DataFrame):
+        """Keep a day's data if it's all in the past (so won't change)
+
+        Arguments:
+            day {pd.Timestamp} -- midnight at the start of the day
+            hourly_data {pd.DataFrame} -- its data
+        """
+
+        if day + pd.Timedelta(days=1) > pd.Timestamp.now(tz=self.tz):
+            return
+
+        with self._lock:
+            self._days[self._day_key(day)] = hourly_data
+            self._days.move_to_end(self._day_key(day))
+
+            while len(self._days) > self.day_cache_size:
+                self._days.popitem(last=False)
+
+
+    def _known_day(self, day: pd.Timestamp) -> pd.DataFrame:
+        """Get a day's data we've kept, or fetch it if it's been forgotten
+
+        Arguments:
+            day {pd.Timestamp} -- midnight at the start of the day
+        """
+
+        with self._lock:
+            hourly_data = self._days.get(self._day_key(day))
+
+            if hourly_data is not None:
+                self._days.move_to_end(self._day_key(day))
+                return hourly_data
+
+        # Another thread pushed it out while we were fetching the rest
+        try:
+            hourly_data = self._hourly_data(
+                self._call_darksky(str(int(day.timestamp())))
+            )
+        except Exception as err:
+            raise ForecastException(f'Communication error occurred: {err}')
+
+        self._remember_day(day, hourly_data)
+
+        return hourly_data
+
+
     def _call_darksky(self, url_suffix: str = '') -> object:
         """Make call to DarkSky API
 
-        Attempts a call to the API to retrieve a JSON object.
+        Attempts a call to the API to retrieve a JSON object. Each call
+        borrows a session no other call is using, so connections are reused.
 
         Arguments:
             url_suffix {string} -- additional parameter to add to URL call
         """
 
 
-        url = ( 'https://api.darksky.net/forecast/' + self._API_key
+        url = ( self.api_url + self._API_key
                       + '/' + str(self.latitude) + ',' + str(self.longitude)
-                      + url_suffix
         );
 
         if url_suffix:
@@ -218,10 +687,142 @@ class Forecaster(object):
             'units' : 'si'
         }
 
-        response = requests.get(url = url, params = params)
+        with self._lock:
+            session = self._sessions.pop() if self._sessions else requests.Session()
+
+        try:
+            response = session.get(
+                url = url, params = params, timeout = self.request_timeout
+            )
+        finally:
+            with self._lock:
+                self._sessions.append(session)
 
         if response.status_code != 200 :
             # We couldn't communicate with the API - return the previous forecast
             raise ForecastException("DarkSky API did not respond. Check API key")
 
-        return response.json()
\ No newline at end of file
+        return response.json()
+
+
+
+class ReplayForecaster(ForecastProvider):
+    """Serves forecasts from a local archive, without the network
+
+    The archive is either a directory of forecasts saved by the Forecaster
+    (each hour is served from the latest one saved at or before it) or a
+    long series of hourly weather, as a CSV file or DataFrame, from which
+    48 hour windows are cut.
+    """
+
+    # Hours of the horizon served from an hourly series
+    horizon = 48
+
+    # Oldest saved forecast we'll serve from, in hours
+    max_age = 12
+
+    def __init__(
+        self, source, latitude = 57.6568, longitude = -3.5818, tz='Europe/London'
+    ):
+        """Index the archive
+
+        Arguments:
+            source {string or pd.DataFrame} -- directory of saved forecasts,
+                or hourly weather (CSV filename or DataFrame)
+            latitude {float or string} -- latitude
+            longitude {float or string} -- longitude
+            tz {string} -- timezone
+        """
+
+        self.tz = tz
+        self.latitude = latitude
+        self.longitude = longitude
+
+        self._files = None
+        self._series = None
+
+        if isinstance(source, str) and os.path.isdir(source):
+            self._files = saved_forecasts(source, latitude, longitude, tz)
+        else:
+            self._series = self._load_series(source)
+
+        # The file we read last, as consecutive hours usually share it
+        self._last_read = (None, None)
+
+
+    def _load_series(self, source) -> pd.DataFrame:
+        """Load hourly weather, adding daily average temperatures if needed
+
+        Arguments:
+            source {string or pd.DataFrame} -- CSV filename or DataFrame
+        """
+
+        if isinstance(source, pd.DataFrame):
+            series = source.copy()
+            if series.index.tz is None:
+                series.index = series.index.tz_localize(self.tz)
+            else:
+                series.index = series.index.tz_convert(self.tz)
+        else:
+            series = read_forecast(source, self.tz)
+
+        series = series.sort_index()
+
+        if 'daily_average' not in series:
+            series['daily_average'] = series.groupby(
+                series.index.date
+            )['temperature'].transform('mean')
+
+        return series
+
+
+    def get_forecast(
+            self,
+            sim_start_time: pd.Timestamp = None,
+            fresh: bool = False
+        ) -> pd.DataFrame:
+        """Get 48 hour forecast from the archive
+
+        Arguments:
+            sim_start_time {pd.Timestamp} -- simulation start time; if not
+                supplied start time is the current hour.
+            fresh {bool} -- ignored, as the archive never changes
+        """
+
+        start_time = (sim_start_time or pd.Timestamp.now(tz=self.tz)).replace(
+            minute=0, second=0, microsecond=0, nanosecond=0
+        )
+
+        if self._files is not None:
+            return self._saved_forecast(start_time)
+
+        first = self._series.index.searchsorted(start_time)
+        last = self._series.index.searchsorted(
+            start_time + pd.Timedelta(hours=self.horizon), side='right'
+        )
+
+        if first >= last:
+            raise ForecastException(f'No weather archived for {start_time}')
+
+        return self._series.iloc[first:last].copy()
+
+
+    def _saved_forecast(self, start_time: pd.Timestamp) -> pd.DataFrame:
+        """Serve the latest saved forecast, from the start time onwards
+
+        Arguments:
+            start_time {pd.Timestamp} -- the hour the forecast starts
+        """
+
+        position = self._files.index.searchsorted(start_time, side='right') - 1
+
+        if (position < 0 or start_time - self._files.index[position]
+                > pd.Timedelta(hours=self.max_age)):
+            raise ForecastException(f'No forecast archived for {start_time}')
+
+        filename = self._files.iloc[position]
+
+        if self._last_read[0] != filename:
+            self._last_read = (filename, read_forecast(filename, self.tz))
+
+        return self._last_read[1].truncate(before=start_time).copy()
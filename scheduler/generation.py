@@ -1,31 +1,577 @@
 # Renewable generation at Findhorn
-from windpowerlib import WindFarm
-from windpowerlib import WindTurbine
-from windpowerlib import WindTurbineCluster
-from windpowerlib.turbine_cluster_modelchain import TurbineClusterModelChain
-import pvlib
-from pvlib.pvsystem import PVSystem
-from pvlib.location import Location
-from pvlib.modelchain import ModelChain
-from pvlib.forecast import GFS
-from pvlib.irradiance import disc
 import pandas as pd
 import numpy as np
+from .solar import SolarTable
 import datetime
-import scipy
-import sys
+import json
+import os
+import tempfile
 
-# University computers can't install tables (bosc needs C++ compiler)
-try:
-    import tables
-except ImportError:
-    pass
+# pvlib and windpowerlib (and SciPy with them) are slow to import, so they're
+# only imported once we have PV arrays or wind turbines to model
 
 
 class RenewablesException(Exception):
     pass
 
 
+# Where resolved PV module and inverter parameters are kept between runs
+# (None to not keep them)
+sam_cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'pyrematcher')
+
+# Where sites' sun positions and clear sky irradiance are kept between runs
+# (None to work them out every time)
+solar_table_dir = os.path.join(sam_cache_dir, 'solar')
+
+# SAM databases loaded so far (shared by every LocalRE)
+_sam_databases = {}
+
+# Parameters resolved so far, by name and the databases looked in
+_sam_parameters = {}
+
+# The on-disk cache's parameters, once we've read it
+_sam_cache = None
+
+# Whether we have PyTables, once we've looked
+_have_tables = None
+
+
+def _sam_cache_filename() -> str:
+    """Get the file caching parameters from this version's SAM databases
+
+    The databases ship with pvlib, so its version is theirs.
+    """
+
+    from importlib.metadata import version, PackageNotFoundError
+
+    try:
+        pvlib_version = version('pvlib')
+    except PackageNotFoundError:
+        pvlib_version = 'unknown'
+
+    return os.path.join(sam_cache_dir, f'sam-parameters-{pvlib_version}.json')
+
+
+def _read_sam_cache() -> dict:
+    """Get the cached parameters, reading the cache the first time
+    """
+
+    global _sam_cache
+
+    if _sam_cache is None:
+        _sam_cache = {}
+
+        if sam_cache_dir:
+            try:
+                with open(_sam_cache_filename()) as cache:
+                    _sam_cache = json.load(cache)
+            except (OSError, ValueError):
+                pass
+
+    return _sam_cache
+
+
+def _write_sam_cache(key: str, parameters: pd.Series):
+    """Add parameters to the cache on disk
+
+    Written to a temporary file and moved into place, so other processes
+    never see half a cache. If we can't write it we just carry on.
+
+    Arguments:
+        key {string} -- cache key
+        parameters {pd.Series} -- the parameters
+    """
+
+    cache = _read_sam_cache()
+    cache[key] = {
+        name: value.item() if isinstance(value, np.generic) else value
+        for name, value in parameters.items()
+    }
+
+    if not sam_cache_dir:
+        return
+
+    try:
+        os.makedirs(sam_cache_dir, exist_ok=True)
+
+        # Pick up anything other processes have added since we read it
+        try:
+            with open(_sam_cache_filename()) as stored:
+                cache = {**json.load(stored), **cache}
+        except (OSError, ValueError):
+            pass
+
+        descriptor, temporary = tempfile.mkstemp(dir=sam_cache_dir, suffix='.tmp')
+
+        with os.fdopen(descriptor, 'w') as new_cache:
+            json.dump(cache, new_cache, separators=(',', ':'))
+
+        os.replace(temporary, _sam_cache_filename())
+
+    except OSError:
+        pass
+
+
+def _find_sam_parameters(name: str, databases: list) -> pd.Series:
+    """Find a PV module or inverter in the first SAM database that has it
+
+    Looks in memory, then in the cache on disk, and only loads the databases
+    (which takes seconds) if neither has it. Returns None if none of them
+    have it.
+
+    Arguments:
+        name {string} -- module or inverter name
+        databases {list} -- SAM database names, in the order to look
+    """
+
+    key = '/'.join(databases) + '/' + name
+
+    if key in _sam_parameters:
+        return _sam_parameters[key]
+
+    cached = _read_sam_cache().get(key)
+
+    if cached is not None:
+        _sam_parameters[key] = pd.Series(cached, name=name, dtype=object)
+        return _sam_parameters[key]
+
+    for database in databases:
+
+        if database not in _sam_databases:
+            import pvlib
+            _sam_databases[database] = pvlib.pvsystem.retrieve_sam(database)
+
+        if name in _sam_databases[database]:
+            _sam_parameters[key] = _sam_databases[database][name]
+            _write_sam_cache(key, _sam_parameters[key])
+
+            return _sam_parameters[key]
+
+    return None
+
+
+def have_tables() -> bool:
+    """Whether PyTables is installed (for the Ineichen clear sky model)
+
+    University computers can't install tables (bosc needs C++ compiler).
+    """
+
+    global _have_tables
+
+    if _have_tables is None:
+        try:
+            import tables
+            _have_tables = True
+        except ImportError:
+            _have_tables = False
+
+    return _have_tables
+
+
+def cloud_cover_to_ghi(cloud_cover, ghi_clear, offset: float = 35):
+    """Estimate global horizontal irradiance from cloud cover
+
+    Scales the clear sky GHI linearly, from all of it with no cloud down to
+    offset % of it with full cloud cover (as pvlib's old GFS forecast model
+    did). Works on arrays or Series.
+
+    Arguments:
+        cloud_cover {array} -- cloud cover (%)
+        ghi_clear {array} -- clear sky GHI (W/m2)
+        offset {float} -- GHI under full cloud cover (% of clear sky)
+    """
+
+    offset = offset / 100.
+
+    return (offset + (1 - offset) * (1 - cloud_cover / 100.)) * ghi_clear
+
+
+def extra_radiation(day_of_year, solar_constant: float = 1366.1) -> np.ndarray:
+    """Get extraterrestrial irradiance by Spencer's formula (as pvlib does)
+
+    Arguments:
+        day_of_year {array} -- day of the year (1 to 366)
+        solar_constant {float} -- solar constant (W/m2)
+    """
+
+    day_angle = (2. * np.pi / 365.) * (np.asarray(day_of_year) - 1)
+
+    return solar_constant * (
+        1.00011 + 0.034221 * np.cos(day_angle) + 0.00128 * np.sin(day_angle)
+        + 0.000719 * np.cos(2 * day_angle) + 7.7e-05 * np.sin(2 * day_angle)
+    )
+
+
+def disc_dni(
+        ghi,
+        zenith,
+        day_of_year,
+        min_cos_zenith: float = 0.065,
+        max_zenith: float = 87,
+        max_airmass: float = 12
+    ) -> np.ndarray:
+    """Estimate direct normal irradiance from GHI by the DISC model
+
+    The same as pvlib.irradiance.disc at standard pressure, on plain arrays.
+
+    Arguments:
+        ghi {array} -- global horizontal irradiance (W/m2)
+        zenith {array} -- solar zenith (degrees)
+        day_of_year {array} -- day of the year (1 to 366)
+        min_cos_zenith {float} -- lowest cos(zenith) used for the clearness
+            index
+        max_zenith {float} -- DNI is zero with the sun lower than this
+        max_airmass {float} -- highest airmass used for the direct beam
+    """
+
+    ghi = np.asarray(ghi, dtype=float)
+    zenith = np.asarray(zenith, dtype=float)
+
+    # Extraterrestrial irradiance (with a 1370 W/m2 solar constant)
+    dni_extra = extra_radiation(day_of_year, 1370.)
+
+    # Clearness index
+    cos_zenith = np.cos(np.radians(zenith))
+    kt = ghi / (dni_extra * np.maximum(cos_zenith, min_cos_zenith))
+    kt = np.clip(kt, 0, 1)
+
+    # Kasten (1966) airmass - none with the sun below the horizon
+    with np.errstate(invalid='ignore'):
+        below = zenith > 90
+        airmass = 1. / (cos_zenith + 0.15 * (93.885 - zenith) ** -1.253)
+        airmass = np.minimum(np.where(below, np.nan, airmass), max_airmass)
+
+    # Direct beam clearness, by Horner's method
+    cloudy = kt <= 0.6
+    a = np.where(cloudy,
+                 0.512 + kt * (-1.56 + kt * (2.286 - 2.222 * kt)),
+                 -5.743 + kt * (21.77 + kt * (-27.49 + 11.56 * kt)))
+    b = np.where(cloudy,
+                 0.37 + 0.962 * kt,
+                 41.4 + kt * (-118.5 + kt * (66.05 + 31.9 * kt)))
+    c = np.where(cloudy,
+                 -0.28 + kt * (0.932 - 2.048 * kt),
+                 -47.01 + kt * (184.2 + kt * (-222.0 + 73.81 * kt)))
+
+    kn_clear = 0.866 + airmass * (-0.122 + airmass * (
+        0.0121 + airmass * (-0.000653 + 1.4e-05 * airmass)))
+
+    dni = (kn_clear - (a + b * np.exp(c * airmass))) * dni_extra
+
+    with np.errstate(invalid='ignore'):
+        bad_values = (zenith > max_zenith) | (ghi < 0) | (dni < 0)
+
+    return np.where(bad_values, 0, dni)
+
+
+class PVArrays(object):
+    """A site's PV arrays, modelled together
+
+    Does what a pvlib ModelChain with physical AOI losses and no spectral
+    losses does for each array - Hay-Davies transposition, SAPM cell
+    temperature, a CEC (single diode) or Sandia module model and a Sandia or
+    ADR inverter model - but on arrays with a column per PV array, so a site
+    with many arrays costs much the same as one.
+    """
+
+    # Module parameters for each DC model
+    cec_parameters = ['a_ref', 'I_L_ref', 'I_o_ref', 'R_sh_ref', 'R_s',
+                      'alpha_sc', 'Adjust']
+    sapm_parameters = ['Bvmpo', 'Mbvmp', 'Bvoco', 'Mbvoc', 'N',
+                       'Cells_in_Series', 'Isco', 'Aisc', 'Impo', 'C0', 'C1',
+                       'Aimp', 'Voco', 'Vmpo', 'C2', 'C3', 'IXO', 'C4', 'C5',
+                       'IXXO', 'C6', 'C7']
+
+    # Inverter parameters for the Sandia model
+    snl_parameters = ['Paco', 'Pdco', 'Vdco', 'Pso', 'C0', 'C1', 'C2', 'C3',
+                      'Pnt']
+
+    def __init__(self, systems: dict):
+        """Gather the arrays' parameters into columns
+
+        Arguments:
+            systems {dict} -- pvlib PVSystems by PV array name
+        """
+
+        from pvlib.pvsystem import TEMP_MODEL_PARAMS
+
+        self.names = list(systems)
+        systems = list(systems.values())
+
+        def column(values):
+            return np.array(values, dtype=float)
+
+        self.surface_tilt = column([ system.surface_tilt for system in systems ])
+        self.surface_azimuth = column([ system.surface_azimuth for system in systems ])
+        self.albedo = column([ system.albedo for system in systems ])
+        self.modules_per_string = column(
+            [ system.modules_per_string for system in systems ]
+        )
+        self.strings_per_inverter = column(
+            [ system.strings_per_inverter for system in systems ]
+        )
+
+        # Physical AOI loss model, with pvlib's defaults
+        self.iam_parameters = {
+            name: column([ system.module_parameters.get(name, default)
+                           for system in systems ])
+            for name, default in [('n', 1.526), ('K', 4.), ('L', 0.002)]
+        }
+        self.fd = column([ system.module_parameters.get('FD', 1.)
+                           for system in systems ])
+
+        # SAPM cell temperature model
+        self.temperature_model = [
+            column(parameters) for parameters in zip(*[
+                TEMP_MODEL_PARAMS['sapm'][system.racking_model.lower()]
+                for system in systems
+            ])
+        ]
+
+        # Arrays are evaluated together with the others using the same model
+        self.cec, self.sapm, self.snl, self.adr = [], [], [], []
+
+        for number, system in enumerate(systems):
+
+            if set(['A0', 'A1', 'C7']) <= set(system.module_parameters.keys()):
+                self.sapm.append(number)
+            elif set(self.cec_parameters) <= set(system.module_parameters.keys()):
+                self.cec.append(number)
+            else:
+                raise RenewablesException(
+                    'No DC model for PV array ' + self.names[number]
+                )
+
+            if set(['C0', 'C1', 'C2']) <= set(system.inverter_parameters.keys()):
+                self.snl.append(number)
+            elif 'ADRCoefficients' in system.inverter_parameters:
+                self.adr.append(number)
+            else:
+                raise RenewablesException(
+                    'No AC model for PV array ' + self.names[number]
+                )
+
+        self.cec_module = {
+            name: column([ systems[number].module_parameters[name]
+                           for number in self.cec ])
+            for name in self.cec_parameters
+        }
+        self.sapm_module = {
+            name: column([ systems[number].module_parameters[name]
+                           for number in self.sapm ])
+            for name in self.sapm_parameters
+        }
+        self.snl_inverter = {
+            name: column([ systems[number].inverter_parameters[name]
+                           for number in self.snl ])
+            for name in self.snl_parameters
+        }
+
+        # ADR coefficients don't broadcast, so these go one at a time
+        self.adr_inverters = [ systems[number].inverter_parameters
+                               for number in self.adr ]
+
+
+    def ac(self, weather: pd.DataFrame) -> np.ndarray:
+        """Get the AC output of every array (W), a column per array
+
+        Arguments:
+            weather {pd.DataFrame} -- hourly 'apparent_zenith', 'azimuth',
+                'dni', 'ghi' and 'dhi', with 'temp_air' (20 C if missing)
+                and 'wind_speed' (0 if missing) as pvlib has them
+        """
+
+        from pvlib import irradiance, pvsystem
+
+        def hourly(name, default=None):
+            if name not in weather:
+                return np.full((len(weather.index), 1), default, dtype=float)
+            return weather[name].to_numpy(dtype=float)[:, np.newaxis]
+
+        zenith = hourly('apparent_zenith')
+        azimuth = hourly('azimuth')
+
+        # Plane of array irradiance
+        aoi = irradiance.aoi(
+            self.surface_tilt, self.surface_azimuth, zenith, azimuth
+        )
+        poa = irradiance.get_total_irradiance(
+            self.surface_tilt, self.surface_azimuth, zenith, azimuth,
+            hourly('dni'), hourly('ghi'), hourly('dhi'),
+            dni_extra=extra_radiation(weather.index.dayofyear)[:, np.newaxis],
+            albedo=self.albedo,
+            model='haydavies'
+        )
+
+        effective_irradiance = (
+            poa['poa_direct'] * pvsystem.physicaliam(aoi, **self.iam_parameters)
+            + self.fd * poa['poa_diffuse']
+        )
+
+        # SAPM cell temperature
+        a, b, delta_t = self.temperature_model
+        temp_cell = (
+            poa['poa_global'] * np.exp(a + b * hourly('wind_speed', 0))
+            + hourly('temp_air', 20)
+            + poa['poa_global'] / 1000. * delta_t
+        )
+
+        # DC output, for the whole strings
+        v_mp = np.empty_like(effective_irradiance)
+        p_mp = np.empty_like(effective_irradiance)
+
+        if self.cec:
+            dc = pvsystem.singlediode(*pvsystem.calcparams_cec(
+                effective_irradiance[:, self.cec], temp_cell[:, self.cec],
+                **self.cec_module
+            ))
+            v_mp[:, self.cec] = np.where(np.isnan(dc['v_mp']), 0, dc['v_mp'])
+            p_mp[:, self.cec] = np.where(np.isnan(dc['p_mp']), 0, dc['p_mp'])
+
+        if self.sapm:
+            dc = pvsystem.sapm(
+                effective_irradiance[:, self.sapm] / 1000.,
+                temp_cell[:, self.sapm],
+                self.sapm_module
+            )
+            v_mp[:, self.sapm] = dc['v_mp']
+            p_mp[:, self.sapm] = dc['p_mp']
+
+        v_mp *= self.modules_per_string
+        p_mp *= self.modules_per_string * self.strings_per_inverter
+
+        # AC output
+        ac = np.empty_like(effective_irradiance)
+
+        if self.snl:
+            ac[:, self.snl] = pvsystem.snlinverter(
+                v_mp[:, self.snl], p_mp[:, self.snl], self.snl_inverter
+            )
+
+        for number, inverter in zip(self.adr, self.adr_inverters):
+            ac[:, number] = pvsystem.adrinverter(
+                v_mp[:, number], p_mp[:, number], inverter
+            )
+
+        return ac
+
+
+class WindFarmCurve(object):
+    """A wind farm's power output worked out straight from wind speeds
+
+    Does what windpowerlib's TurbineClusterModelChain does for a power curve
+    without density correction - wind profile up to the farm's mean hub
+    height, wake losses and the farm's aggregated power curve - on plain
+    arrays. The aggregated power curve only depends on the farm and the
+    roughness length, so it is only worked out once.
+    """
+
+    @staticmethod
+    def supports(modelchain) -> bool:
+        """Whether we can stand in for a model chain
+
+        Arguments:
+            modelchain {TurbineClusterModelChain} -- the model chain
+        """
+
+        return (
+            modelchain.power_output_model == 'power_curve'
+            and modelchain.density_correction is False
+            and modelchain.wind_speed_model in ['logarithmic', 'hellman']
+        )
+
+
+    def __init__(self, modelchain, roughness_length: float, height: float):
+        """Get the farm's hub height and power curve from its model chain
+
+        Arguments:
+            modelchain {TurbineClusterModelChain} -- the model chain
+            roughness_length {float} -- roughness length (m)
+            height {float} -- height of the forecast wind speeds (m)
+        """
+
+        from windpowerlib import wake_losses
+
+        # Aggregate the turbines' power curves as the model chain does
+        modelchain.assign_power_curve(pd.DataFrame(
+            { ('roughness_length', 0): [ roughness_length ] }
+        ))
+        modelchain.power_plant.mean_hub_height()
+
+        self.hub_height = modelchain.power_plant.hub_height
+        self.power_curve_wind_speeds = modelchain.power_plant.power_curve[
+            'wind_speed'].to_numpy(dtype=float)
+        self.power_curve_values = modelchain.power_plant.power_curve[
+            'value'].to_numpy(dtype=float)
+
+        # Wind speed profile up to the hub
+        self.height = height
+        self.roughness_length = roughness_length
+        self.wind_speed_model = modelchain.wind_speed_model
+        self.obstacle_height = modelchain.obstacle_height
+        self.hellman_exp = modelchain.hellman_exp
+
+        # Wake losses as a wind efficiency curve (others are in the power
+        # curve already)
+        self.efficiency_curve = None
+
+        if modelchain.wake_losses_model not in [
+                None, 'power_efficiency_curve', 'constant_efficiency']:
+            curve = wake_losses.get_wind_efficiency_curve(
+                curve_name=modelchain.wake_losses_model
+            )
+            self.efficiency_curve = (
+                curve['wind_speed'].to_numpy(dtype=float),
+                curve['efficiency'].to_numpy(dtype=float)
+            )
+
+
+    def wind_speed_hub(self, wind_speed: np.ndarray) -> np.ndarray:
+        """Get the wind speed at the farm's hub height
+
+        Arguments:
+            wind_speed {np.ndarray} -- wind speed at the forecast height (m/s)
+        """
+
+        if self.hub_height == self.height:
+            return wind_speed
+
+        if self.wind_speed_model == 'logarithmic':
+            return (
+                wind_speed
+                * np.log((self.hub_height - 0.7 * self.obstacle_height)
+                         / self.roughness_length)
+                / np.log((self.height - 0.7 * self.obstacle_height)
+                         / self.roughness_length)
+            )
+
+        hellman_exp = self.hellman_exp
+        if hellman_exp is None:
+            hellman_exp = 1 / np.log(self.hub_height / self.roughness_length)
+
+        return wind_speed * (self.hub_height / self.height) ** hellman_exp
+
+
+    def power_output(self, wind_speed: np.ndarray) -> np.ndarray:
+        """Get the farm's power output (W)
+
+        Arguments:
+            wind_speed {np.ndarray} -- wind speed at the forecast height (m/s)
+        """
+
+        wind_speed_hub = self.wind_speed_hub(wind_speed)
+
+        if self.efficiency_curve:
+            wind_speed_hub = wind_speed_hub * np.interp(
+                wind_speed_hub, *self.efficiency_curve
+            )
+
+        return np.interp(
+            wind_speed_hub, self.power_curve_wind_speeds,
+            self.power_curve_values, left=0, right=0
+        )
+
+
 class LocalRE(object):
 
     forecast_height = 10 # for DarkSky API
@@ -51,6 +597,40 @@ class LocalRE(object):
 
         self.pv_forecast = pd.DataFrame()
 
+        self.wind_modelchain = None
+        self.wind_model = None
+        self.pv_location = None
+        self.solar_table = None
+        self.pv_systems = {}
+        self.pv_model = None
+
+        if wind_turbines:
+            self._setup_wind(wind_turbines, latitude, longitude, hellman_exp)
+
+        if pv_arrays:
+            self._setup_pv(pv_arrays, latitude, longitude, altitude)
+
+
+    def _setup_wind(
+            self,
+            wind_turbines: list,
+            latitude: float,
+            longitude: float,
+            hellman_exp: float
+        ):
+        """ Set up the wind farm model
+
+        Arguments:
+            wind_turbines {list} -- turbine dicts (see constructor)
+            latitude {float} -- latitude
+            longitude {float} -- longitude
+            hellman_exp {float} -- Hellman exponent for wind speed with height
+        """
+
+        from windpowerlib import WindFarm
+        from windpowerlib import WindTurbine
+        from windpowerlib.turbine_cluster_modelchain import TurbineClusterModelChain
+
         # Wind turbine(s)
         turbines = []
 
@@ -82,6 +662,33 @@ class LocalRE(object):
             hellman_exp = hellman_exp,
         )
 
+        # Work the power out directly if we can, rather than through
+        # windpowerlib's DataFrames
+        if WindFarmCurve.supports(self.wind_modelchain):
+            self.wind_model = WindFarmCurve(
+                self.wind_modelchain, self.roughness_length, self.forecast_height
+            )
+
+
+    def _setup_pv(
+            self,
+            pv_arrays: list,
+            latitude: float,
+            longitude: float,
+            altitude: float
+        ):
+        """ Set up the PV array models
+
+        Arguments:
+            pv_arrays {list} -- PV array dicts (see constructor)
+            latitude {float} -- latitude
+            longitude {float} -- longitude
+            altitude {float} -- altitude
+        """
+
+        from pvlib.pvsystem import PVSystem
+        from pvlib.location import Location
+
         # Initialise PV models
         self.pv_location = Location(
             latitude=latitude,
@@ -89,57 +696,57 @@ class LocalRE(object):
             altitude=altitude
         )
 
-        # Now set up the PV array & system.
-        cec_pv_model_params = pvlib.pvsystem.retrieve_sam('CECMod')
-        sandia_pv_model_params = pvlib.pvsystem.retrieve_sam('SandiaMod')
-        cec_inverter_model_params = pvlib.pvsystem.retrieve_sam('CECInverter')
-        adr_inverter_model_params = pvlib.pvsystem.retrieve_sam('ADRInverter')
-
-        self.pv_modelchains = {}
+        # Ineichen clear sky model uses pytables for turbidity - if we
+        # can't, use 'Simplified Solis'
+        self.solar_table = SolarTable(
+            self.pv_location,
+            solar_table_dir,
+            'ineichen' if have_tables() else 'simplified_solis'
+        )
 
+        # Now set up the PV array & system.
         for pv_array in pv_arrays:
 
             # Try to find the module names in the libraries
-            if pv_array['module_name'] in cec_pv_model_params:
-                pv_array['module_parameters'] = cec_pv_model_params[
-                    pv_array['module_name']
-                ]
-            elif pv_array['module_name'] in sandia_pv_model_params:
-                pv_array['module_parameters'] = sandia_pv_model_params[
-                    pv_array['module_name']
-                ]
-            else:
-                raise RenewablesException('Could not retrieve PV module data')
+            pv_array['module_parameters'] = _find_sam_parameters(
+                pv_array['module_name'], ['CECMod', 'SandiaMod']
+            )
 
-            # Do the same with the inverter(s)
-            if pv_array['inverter_name'] in cec_inverter_model_params:
-                pv_array['inverter_parameters'] = cec_inverter_model_params[
-                    pv_array['inverter_name']
-                ]
-            elif pv_array['inverter_name'] in adr_inverter_model_params:
-                pv_array['inverter_parameters'] = adr_inverter_model_params[
-                    pv_array['inverter_name']
-                ]
-            else:
+            if pv_array['module_parameters'] is None:
                 raise RenewablesException('Could not retrieve PV module data')
 
-            self.pv_modelchains[pv_array['name']] = ModelChain(
-                PVSystem(**pv_array),
-                self.pv_location,
-                aoi_model='physical',
-                spectral_model='no_loss'
+            # Do the same with the inverter(s)
+            pv_array['inverter_parameters'] = _find_sam_parameters(
+                pv_array['inverter_name'], ['CECInverter', 'ADRInverter']
             )
 
+            if pv_array['inverter_parameters'] is None:
+                raise RenewablesException('Could not retrieve PV inverter data')
+
+            self.pv_systems[pv_array['name']] = PVSystem(**pv_array)
+
+        # All the arrays are modelled in one go
+        self.pv_model = PVArrays(self.pv_systems)
+
 
     def make_generation_forecasts(self, forecast):
         """ Makes generation forecast data from the supplied Dark Sky forecast
 
+        Only makes the forecasts for the sources we have.
+
         Arguments:
             forecast {pandas.DataFrame} -- DarkSky originated forecast
         """
 
-        self.pv_forecast = self._make_pv_forecast(forecast)
-        self.wind_forecast = self._make_wind_forecast(forecast)
+        self.pv_forecast = (
+            self._make_pv_forecast(forecast) if self.pv_model
+            else forecast
+        )
+
+        if self.wind_model:
+            self.wind_forecast = forecast
+        elif self.wind_modelchain:
+            self.wind_forecast = self._make_wind_forecast(forecast)
 
 
     def _make_pv_forecast(self, forecast)  -> pd.DataFrame:
@@ -159,34 +766,25 @@ class LocalRE(object):
             }
         )
 
-        # Use PV lib to get insolation based on the cloud cover reported here
-
-        model = GFS()
-
         # Next up, we get hourly solar irradiance using interpolated cloud cover
-        # We can get this from the clearsky GHI...
-
-        if tables in sys.modules:
-            # We can use Ineichen clear sky model (uses pytables for turbidity)
-            clearsky = self.pv_location.get_clearsky(pv_forecast.index)
-
-        else:
-            # We can't, so use 'Simplified Solis'
-            clearsky = self.pv_location.get_clearsky(
-                pv_forecast.index, model='simplified_solis'
-            )
-
+        # We can get this from the clearsky GHI and by knowledge of where the
+        # sun is, both of which are looked up for the site
+        solar = self.solar_table.lookup(pv_forecast.index)
+        fields = self.solar_table.fields
 
-        # ... and by knowledge of where the sun is
-        solpos = self.pv_location.get_solarposition(pv_forecast.index)
+        # Insolation from the cloud cover reported here
+        zenith = solar[fields.index('zenith')]
 
-        ghi = model.cloud_cover_to_ghi_linear(
-            pv_forecast['cloudCover'] * 100, clearsky['ghi']
+        ghi = cloud_cover_to_ghi(
+            pv_forecast['cloudCover'].to_numpy(dtype=float) * 100,
+            solar[fields.index('ghi')]
         )
-        dni = disc(ghi, solpos['zenith'], pv_forecast.index)['dni']
-        dhi = ghi - dni * np.cos(np.radians(solpos['zenith']))
+        dni = disc_dni(ghi, zenith, pv_forecast.index.dayofyear)
+        dhi = ghi - dni * np.cos(np.radians(zenith))
 
         # Whump it all together and we have our forecast!
+        pv_forecast['apparent_zenith'] = solar[fields.index('apparent_zenith')]
+        pv_forecast['azimuth'] = solar[fields.index('azimuth')]
         pv_forecast['dni'] = dni
         pv_forecast['dhi'] = dhi
         pv_forecast['ghi'] = ghi
@@ -244,21 +842,27 @@ class LocalRE(object):
         # Create a total gen column of zeros
         prediction['PV_AC_TOTAL'] = 0
 
-        for pv_array, pv_model in self.pv_modelchains.items():
+        if self.pv_model:
+            pv_ac = self.pv_model.ac(self.pv_forecast)
 
-            pv_model.run_model(prediction.index, self.pv_forecast)
-            output_column_name = 'PV_AC_' + pv_array
-            prediction[output_column_name] = pv_model.ac
+            for number, pv_array in enumerate(self.pv_model.names):
+                prediction['PV_AC_' + pv_array] = pv_ac[:, number]
 
-            # Add to the total column
-            prediction['PV_AC_TOTAL'] = prediction['PV_AC_TOTAL'] + pv_model.ac
+            prediction['PV_AC_TOTAL'] = pv_ac.sum(axis=1)
 
         # Next - wind power.
-        self.wind_modelchain.run_model(
-            self.wind_forecast
-        )
+        if self.wind_model:
+            prediction['WIND_AC'] = self.wind_model.power_output(
+                self.wind_forecast['windSpeed'].to_numpy(dtype=float)
+            )
+        elif self.wind_modelchain:
+            self.wind_modelchain.run_model(
+                self.wind_forecast
+            )
 
-        prediction['WIND_AC'] = self.wind_modelchain.power_output
+            prediction['WIND_AC'] = self.wind_modelchain.power_output
+        else:
+            prediction['WIND_AC'] = 0
 
         # Convert everything into kWh
         prediction = prediction * 0.001
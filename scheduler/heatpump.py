@@ -46,12 +46,25 @@ class HeatPump(object):
 
 
 
+    def COP(self) -> float:
+        """ Get the coefficient of performance at the current temperatures
+        """
+
+        coefficients = self._COP_coefficients()
+
+        return ( coefficients[0]
+                 + coefficients[1] * self.T_amb + coefficients[2] * self.T_amb**2
+                 + coefficients[3] * self.T_out + coefficients[4] * self.T_out**2
+                 + coefficients[5] * self.T_amb * self.T_out )
+
+
     def deliver_heat(self, T_in, mass) -> float:
         """ Determine electricity required to deliver heat for this timestep
 
         Calculates amount of heat required from input temperature (assumed
         constant throughout this timestep) and then determines electrical
-        consumption from COP regression.
+        consumption from COP regression. T_in and mass may also be arrays
+        (one element per scenario).
 
         Returns the amount of electrical energy used.
 
@@ -60,17 +73,12 @@ class HeatPump(object):
             mass {float} -- mass of water being heated (kg)
         """
 
-        if (mass>(self.max_flow_rate*self.timestep*60)):
+        if np.any(mass>(self.max_flow_rate*self.timestep*60)):
             warnings.warn('Mass flow exceeds specified range', HeatPumpWarning)
 
 
         # Calculate COP for these temperatures
-        coefficients = self._COP_coefficients()
-
-        COP = ( coefficients[0]
-                + coefficients[1] * self.T_amb + coefficients[2] * self.T_amb**2
-                + coefficients[3] * self.T_out + coefficients[4] * self.T_out**2
-                + coefficients[5] * self.T_amb * self.T_out )
+        COP = self.COP()
 
         heat_required = ( (self.T_out - T_in ) * mass * self.fluid_specific_heat)
 
@@ -78,10 +86,12 @@ class HeatPump(object):
         max_heat_deliverable = self.nominal_power * self.timestep  # kWh
 
         # Cope with floating point rounding errors here
-        if ((heat_required - max_heat_deliverable) > 0.01):
+        over_capacity = (heat_required - max_heat_deliverable) > 0.01
+        if np.any(over_capacity):
             warnings.warn('Heat demand (' + str(heat_required)
                           + ' exceeds capacity', HeatPumpWarning)
-            heat_required = max_heat_deliverable
+            heat_required = np.where(over_capacity, max_heat_deliverable,
+                                     heat_required)
 
         return heat_required / COP
 
@@ -102,7 +112,4 @@ class HeatPump(object):
 
         max_mass = self.max_flow_rate * 60 * self.timestep
 
-        if mass>max_mass:
-            return max_mass
-
-        return mass
+        return np.minimum(mass, max_mass)
@@ -14,6 +14,136 @@ class TankWarning(Exception):
     pass
 
 
+# LAPACK's tridiagonal solver, once we've imported it (SciPy is slow to
+# import, so only when a tank is first stepped)
+_gtsv = None
+
+
+def _lapack_gtsv():
+    """Get LAPACK's tridiagonal solver (dgtsv) from SciPy
+    """
+
+    global _gtsv
+
+    if _gtsv is None:
+        from scipy.linalg.lapack import dgtsv
+        _gtsv = dgtsv
+
+    return _gtsv
+
+
+def solve_tridiagonal(lower, diag, upper, rhs, c_work=None, d_work=None):
+    """Solve a tridiagonal system A T = C with the Thomas algorithm
+
+    Runs in O(n) rather than the O(n^3) of a dense solve. The node axis is
+    the last one, so any leading axes (e.g. one row per scenario) are solved
+    together - which is what this is for, as the loop over nodes is then
+    shared between them. A single tank is quicker solved by LAPACK. Returns
+    the solution in a new array.
+
+    Arguments:
+        lower {np.ndarray} -- sub-diagonal, A[n,n-1] (element 0 is ignored)
+        diag {np.ndarray} -- main diagonal, A[n,n]
+        upper {np.ndarray} -- super-diagonal, A[n,n+1] (last element ignored)
+        rhs {np.ndarray} -- right hand side, C
+        c_work {np.ndarray} -- optional preallocated buffer, same shape as diag
+        d_work {np.ndarray} -- optional preallocated buffer, same shape as diag
+    """
+
+    nodes = diag.shape[-1]
+
+    c_prime = np.empty_like(diag) if c_work is None else c_work
+    d_prime = np.empty_like(diag) if d_work is None else d_work
+
+    # Forward sweep
+    c_prime[..., 0] = upper[..., 0] / diag[..., 0]
+    d_prime[..., 0] = rhs[..., 0] / diag[..., 0]
+
+    for n in range(1, nodes):
+        denominator = diag[..., n] - lower[..., n] * c_prime[..., n-1]
+        c_prime[..., n] = upper[..., n] / denominator
+        d_prime[..., n] = ( (rhs[..., n] - lower[..., n] * d_prime[..., n-1])
+                            / denominator )
+
+    # Back substitution
+    T = np.empty_like(d_prime)
+    T[..., nodes-1] = d_prime[..., nodes-1]
+
+    for n in range(nodes-2, -1, -1):
+        T[..., n] = d_prime[..., n] - c_prime[..., n] * T[..., n+1]
+
+    return T
+
+
+def allocate_reinjection(capacity, mass, from_top):
+    """Share out injected mass between nodes on a first-come-first-served basis
+
+    Fills nodes in turn until the mass is used up: from the top downwards if
+    from_top is set, otherwise from the bottom upwards. Uses cumulative
+    capacity rather than visiting nodes one at a time, so leading axes (one
+    row per scenario) are handled together.
+
+    Returns the mass allocated to each node and the mass left over once
+    every node is full (positive only where the entire tank has circulated).
+
+    Arguments:
+        capacity {np.ndarray} -- mass each node can still accept
+        mass {np.ndarray} -- mass of inflowing fluid
+        from_top {np.ndarray} -- whether to fill from the top node down
+    """
+
+    from_top = np.asarray(from_top)[..., np.newaxis]
+
+    # Put the nodes in the order they'll be filled
+    ordered_capacity = np.where(from_top, capacity[..., ::-1], capacity)
+
+    # Mass still looking for a home on arriving at each node...
+    filled_before = np.cumsum(ordered_capacity, axis=-1) - ordered_capacity
+    remaining = np.asarray(mass)[..., np.newaxis] - filled_before
+
+    # ...which stops once it has all been absorbed
+    still_going = np.logical_and.accumulate(remaining>0, axis=-1)
+
+    ordered_allocation = np.where(
+        still_going, np.minimum(remaining, ordered_capacity), 0.0
+    )
+
+    leftover = np.where(
+        still_going[..., -1],
+        remaining[..., -1] - ordered_capacity[..., -1],
+        0.0
+    )
+
+    allocation = np.where(from_top, ordered_allocation[..., ::-1],
+                          ordered_allocation)
+
+    return allocation, leftover
+
+
+class TankState(object):
+    """The changing state of a Tank: node temperatures and mass flow buffers
+
+    Taken with Tank.snapshot() and put back with Tank.restore(), which is much
+    cheaper than deep copying the whole tank.
+    """
+
+    __slots__ = ('node_temps', 'input_masses', 'input_temps', 'output_masses')
+
+    def __init__(self, node_temps, input_masses, input_temps, output_masses):
+        self.node_temps = node_temps
+        self.input_masses = input_masses
+        self.input_temps = input_temps
+        self.output_masses = output_masses
+
+    def __eq__(self, other):
+        if not isinstance(other, TankState):
+            return NotImplemented
+        return all(
+            np.array_equal(getattr(self, name), getattr(other, name))
+            for name in self.__slots__
+        )
+
+
 class Tank(object):
 
     # Temperature surrounding the tank. Assume indoors, can be changed
@@ -88,6 +218,24 @@ class Tank(object):
         self.input_temps = np.array([0.0]*self.nodes)
         self.output_masses = np.array([0.0]*self.nodes)
 
+        # Exposed node surface (loss to environment) - top & bottom nodes also
+        # lose heat through the ends of the tank
+        self._loss_areas = np.full(self.nodes, self._node_surface)
+        self._loss_areas[[0, -1]] += self._node_area
+
+        # Conduction between neighbouring nodes: interior nodes conduct both
+        # ways, top & bottom only one way
+        self._conduction_terms = np.full(self.nodes, 2.0)
+        self._conduction_terms[[0, -1]] = 1.0
+
+        # Work buffers for the tridiagonal solve, so we don't allocate
+        # these every timestep
+        self._lower = np.zeros(self.nodes)
+        self._diag = np.zeros(self.nodes)
+        self._upper = np.zeros(self.nodes)
+        self._c_work = np.zeros(self.nodes)
+        self._d_work = np.zeros(self.nodes)
+
 
     def _reinject(self, T_in, mass):
         """Inject fluid into one or more node(s)
@@ -102,69 +250,42 @@ class Tank(object):
         """
         T_in = float(T_in)
 
-        if T_in >= self.node_temps[self.nodes-1]:
-            # Hotter than the top, inject here!
-            target_node = self.nodes-1
-        else:
-            for i in range(self.nodes-1, 0, -1):
-                if (T_in>=self.node_temps[i]):
-                    target_node = i
-            else:
-                # We didn't find any node hot enough to float over our
-                # input - inject at bottom
-                target_node = 0
-
-        # Distribute the mass!
-        injecting_node = target_node
-
-        remaining_mass = mass
-
-        while (remaining_mass>0) :
-
-            # Stick it into this node! But hist - there may be mass already
-            # entering this node, so let's mix them and then see how
-            # much mass there is left over (on a first-come-first served basis)
-
-            if ( (remaining_mass + self.input_masses[injecting_node])
-                 > self._node_mass):
-                # Annoyingly we have mass left over. How much can go in here?
-                mass_for_this_node = ( self._node_mass
-                                        - self.input_masses[injecting_node])
-            else:
-                # Hooray, we can absorb all the mass here!
-                mass_for_this_node = remaining_mass
-
-            # How much left over?
-            remaining_mass -= mass_for_this_node
-
-            # Mix the two flows to get the resultant temperature
-            self.input_temps[injecting_node] = self._mix_temps(
-                [self.input_temps[injecting_node], self.input_masses[injecting_node]],
-                [T_in, mass_for_this_node]
-            )
-            self.input_masses[injecting_node] += mass_for_this_node
-
-            if (remaining_mass>0):
-
-                # Now decide which is our next node
-                if (injecting_node>0 and injecting_node <= target_node):
-                    # We're iterating downwards & there's still space to go - so
-                    # inject to the node below!
-                    injecting_node -= 1
-                elif (injecting_node == 0 and target_node < self.nodes-1):
-                    # we've reached the bottom of the tank, so we're overflowing
-                    # above the original injection node now
-                    injecting_node = target_node+1
-                elif (injecting_node>target_node
-                      and injecting_node < self.nodes-1):
-                    # We're iterating upwards and there's still space to go - so
-                    # inject to the node above!
-                    injecting_node += 1
-                else:
-                    # Uh oh, we've injected the ENTIRE TANK in this timestep.
-                    # Where do we go from here?
-                    raise TankWarning('Entire tank has circulated within one timestep'
-                                       + str(mass) + 'kg ' + str(self.input_masses))
+        # Hotter than the top? Inject there and work downwards. Otherwise no
+        # node is hot enough to float over our input - inject at the bottom
+        # and work upwards.
+        from_top = T_in >= self.node_temps[..., self.nodes-1]
+
+        # Distribute the mass! Each node takes what it can on a
+        # first-come-first-served basis, allowing for mass already entering it
+        allocation, leftover = allocate_reinjection(
+            self._node_mass - self.input_masses, mass, from_top
+        )
+
+        # Mix the flows to get the resultant temperatures
+        total_mass = self.input_masses + allocation
+        injected = allocation != 0
+        self.input_temps[injected] = (
+            ( self.input_temps[injected] * self.input_masses[injected]
+              + T_in * allocation[injected] )
+            / total_mass[injected]
+        )
+        self.input_masses[...] = total_mass
+
+        if np.any(leftover>0):
+            self._tank_circulated(leftover>0, mass)
+
+
+    def _tank_circulated(self, circulated, mass):
+        """Deal with the entire tank being injected in this timestep
+
+        Arguments:
+            circulated {np.ndarray} -- where there was mass left over
+            mass {float} -- mass of inflowing fluid
+        """
+        # Uh oh, we've injected the ENTIRE TANK in this timestep.
+        # Where do we go from here?
+        raise TankWarning('Entire tank has circulated within one timestep'
+                           + str(mass) + 'kg ' + str(self.input_masses))
 
 
     def _mix_temps(self, *args):
@@ -273,103 +394,303 @@ class Tank(object):
         return energy
 
 
-    def process_timestep(self):
-        """Perform the timestep, obtaining the next set of temperatures
+    def _constant_terms(self) -> Tuple[np.ndarray, np.ndarray, float]:
+        """Get the parts of the timestep's equations that don't change
+
+        These are the main diagonal and right hand side terms that don't
+        depend on the flows or temperatures, and the conductance between
+        nodes. They're worked out again if the tank's characteristics change.
         """
 
-        # flow up into next node - zero at lowest node
-        mass_upflow_in = 0.0
+        key = (self.fluid_specific_heat, self.fluid_conductance, self.timestep,
+               self.wall_U_value, self.T_amb)
 
-        # Compose our matrices then
-        A = np.array([[0.0]*self.nodes]*self.nodes)
-        C = np.array([0.0]*self.nodes)
+        if getattr(self, '_constants_key', None) != key:
+            cp = self.fluid_specific_heat
+            conductance = (self.fluid_conductance * self._node_area
+                           / self._node_height)
 
-        for n in range(0, self.nodes):
+            diag = ( (self._node_mass * cp / self.timestep)
+                     + conductance * self._conduction_terms
+                     + self.wall_U_value * self._loss_areas )
+            rhs = self.wall_U_value * self._loss_areas * self.T_amb
 
-            # Work out how much mass is spilling up out of this node
-            mass_upflow_out = ( mass_upflow_in
-                                + self.input_masses[n]
-                                - self.output_masses[n] )
+            self._constants = (diag, rhs, conductance)
+            self._constants_key = key
 
-            # Check: are we injecting more mass into this node than the node
-            # can contain?
-            if (self.input_masses[n]>self._node_mass):
-                print("ALERT: external flow into node {:d} is greater then the node mass".format(n))
+        return self._constants
 
-            # Exposed node surface (loss to environment) is different for
-            # top & bottom nodes
-            loss_area = self._node_surface
-
-            # Top and bottom node special cases
-            if n==0 or n==(self.nodes-1):
-                loss_area += self._node_area
-
-            A[n,n] = ( (self._node_mass * self.fluid_specific_heat / self.timestep)
-                       + self.output_masses[n] * self.fluid_specific_heat
-                       + ( self.fluid_conductance
-                             * self._node_area
-                             / self._node_height)
-                       + self.wall_U_value * loss_area )
-
-            # Slightly different for top & bottom nodes:
-            if n>0 and n<self.nodes-1:
-                A[n,n] += ( self.fluid_conductance
-                             * self._node_area
-                             / self._node_height)
-
-            if (mass_upflow_out > 0):
-                A[n,n] += mass_upflow_out * self.fluid_specific_heat
-
-            if (mass_upflow_in < 0):
-                A[n,n] -= mass_upflow_in * self.fluid_specific_heat
-
-            if (n>0) :
-                A[n,n-1] = -(self.fluid_conductance * self._node_area
-                                  / self._node_height )
-                if (mass_upflow_in > 0):
-                    A[n,n-1] -= mass_upflow_in * self.fluid_specific_heat
-
-            if (n<self.nodes-1):
-                A[n,n+1] = - (self.fluid_conductance * self._node_area
-                                  / self._node_height )
-
-                if (mass_upflow_out<0):
-                    A[n,n+1] += mass_upflow_out * self.fluid_specific_heat
-
-            C[n] = ( ( self._node_mass * self.fluid_specific_heat
-                       * self.node_temps[n] / self.timestep )
-                     + self.wall_U_value * loss_area * self.T_amb
-                     +  ( self.input_masses[n] * self.fluid_specific_heat
-                          * self.input_temps[n] )
-            )
 
-            # And get ready for the next node
-            mass_upflow_in = mass_upflow_out
+    def process_timestep(self):
+        """Perform the timestep, obtaining the next set of temperatures
+        """
+
+        cp = self.fluid_specific_heat
+        diag, rhs, conductance = self._constant_terms()
+
+        # Work out how much mass is spilling up out of each node, and so how
+        # much flows up into the next node - zero at lowest node
+        # (nodes are always the last axis, so this works for a TankBatch too)
+        # (np.add.accumulate and np.maximum.reduce are np.cumsum and np.max
+        # without the overhead, which counts with only a few nodes)
+        mass_upflow_out = np.add.accumulate(
+            self.input_masses - self.output_masses, axis=-1
+        )
+
+        # Check: are we injecting more mass into any node than it can contain?
+        if np.maximum.reduce(self.input_masses, axis=None)>self._node_mass:
+            overfull = np.nonzero(self.input_masses>self._node_mass)[-1]
+            for n in np.unique(overfull):
+                print("ALERT: external flow into node {:d} is greater then the node mass".format(n))
 
         # Sanity check!
-        if mass_upflow_in>0.0001:
+        if np.maximum.reduce(mass_upflow_out[..., -1], axis=None)>0.0001:
             # (there will be floating point rounding errors)
             raise TankError("Mass imbalance. Inflows: " + str(self.input_masses)
                              + ", outflows: " + str(self.output_masses)
-                             + ", remainder: " + str(mass_upflow_in))
+                             + ", remainder: " + str(mass_upflow_out[..., -1]))
+
+        # Heat carried by flow up out of each node, and (negative) by flow
+        # down into it from the node above
+        upflow = np.maximum(mass_upflow_out, 0) * cp
+        downflow = np.minimum(mass_upflow_out, 0) * cp
+
+        # Compose the three diagonals of A (it's tridiagonal - each node only
+        # talks to the nodes immediately above and below it). Flow into
+        # node n from below is the flow out of node n-1.
+        A_diag = self._diag
+        np.add(diag, self.output_masses * cp, out=A_diag)
+        A_diag += upflow
+        A_diag[..., 1:] -= downflow[..., :-1]
+
+        A_lower = self._lower
+        np.subtract(-conductance, upflow[..., :-1], out=A_lower[..., 1:])
+
+        A_upper = self._upper
+        np.add(-conductance, downflow[..., :-1], out=A_upper[..., :-1])
+
+        C = ( ( self._node_mass * cp / self.timestep ) * self.node_temps
+              + rhs
+              + ( self.input_masses * cp * self.input_temps ) )
 
         # Let's get our new temperatures then: A T = C
-        T = np.linalg.solve(A,C)
+        T = self._solve(A_lower, A_diag, A_upper, C)
 
         # Write new node temps and reset things ready for next timestep
-        self.input_masses = np.array([0.0]*self.nodes)
-        self.input_temps = np.array([0.0]*self.nodes)
-        self.output_masses = np.array([0.0]*self.nodes)
+        self.input_masses.fill(0.0)
+        self.input_temps.fill(0.0)
+        self.output_masses.fill(0.0)
         self.node_temps = T
 
 
+    def _solve(self, A_lower, A_diag, A_upper, C) -> np.ndarray:
+        """Solve the timestep's tridiagonal system A T = C with LAPACK
+
+        Arguments:
+            A_lower {np.ndarray} -- sub-diagonal (element 0 is ignored)
+            A_diag {np.ndarray} -- main diagonal
+            A_upper {np.ndarray} -- super-diagonal (last element ignored)
+            C {np.ndarray} -- right hand side
+        """
+
+        # dgtsv overwrites the diagonals it's given, but they're rebuilt
+        # every timestep anyway
+        _, _, _, T, info = _lapack_gtsv()(
+            A_lower[1:], A_diag, A_upper[:-1], C,
+            overwrite_dl=True, overwrite_d=True, overwrite_du=True,
+            overwrite_b=True
+        )
+
+        if info != 0:
+            raise TankError('Could not solve for node temperatures (LAPACK '
+                            'dgtsv info ' + str(info) + ')')
+
+        return T
+
+
     def get_hp_draw_temp(self):
         """Returns the current temperature of the outflow to the heatpump
         """
-        return self.node_temps[self.heater_draw_node]
+        return self.node_temps[..., self.heater_draw_node]
 
 
     def get_outflow_temp(self):
         """Return the current temperature at the outflow node
         """
-        return self.node_temps[self.outflow_node]
\ No newline at end of file
+        return self.node_temps[..., self.outflow_node]
+
+
+    def snapshot(self) -> TankState:
+        """Take a copy of the current tank state
+        """
+        return TankState(
+            self.node_temps.copy(),
+            self.input_masses.copy(),
+            self.input_temps.copy(),
+            self.output_masses.copy()
+        )
+
+
+    def restore(self, state: TankState):
+        """Put the tank back to a previously taken state
+
+        Arguments:
+            state {TankState} -- a state from snapshot() on a tank of the same
+                shape
+        """
+        self.node_temps = state.node_temps.copy()
+        np.copyto(self.input_masses, state.input_masses)
+        np.copyto(self.input_temps, state.input_temps)
+        np.copyto(self.output_masses, state.output_masses)
+
+
+class TankBatch(Tank):
+    """Many copies of the same tank, one per scenario, stepped together
+
+    State arrays (node_temps and the mass flow buffers) have shape
+    (scenarios, nodes) so that a whole set of candidate schedules can be
+    simulated with array operations. Where a scenario circulates its entire
+    tank in one timestep it is flagged in `circulated` rather than raising a
+    TankWarning, so the other scenarios can carry on.
+    """
+
+    def __init__(self, nodes, scenarios=1, **characteristics):
+        """Initialise the batch of identical tanks
+
+        Arguments:
+            nodes -- the number of nodes to model (at least 3)
+            scenarios {int} -- the number of tanks to run side by side
+            physical_chacteristics {dict} -- as for Tank
+        """
+        super().__init__(nodes, **characteristics)
+        self._setup_scenarios(scenarios)
+
+
+    @classmethod
+    def from_tank(cls, tank: Tank, scenarios: int):
+        """Create a batch where each scenario starts from the state of a tank
+
+        Arguments:
+            tank {Tank} -- the tank to copy characteristics and state from
+            scenarios {int} -- the number of scenarios to run
+        """
+        batch = cls.__new__(cls)
+        batch.__dict__.update(vars(tank))
+        batch._setup_scenarios(scenarios)
+
+        return batch
+
+
+    def _setup_scenarios(self, scenarios):
+        """Broadcast the tank state to one row per scenario
+        """
+        self.scenarios = scenarios
+        shape = (scenarios, self.nodes)
+
+        self.node_temps = np.tile(np.asarray(self.node_temps, dtype=float),
+                                  (scenarios, 1))
+        self.input_masses = np.tile(self.input_masses, (scenarios, 1))
+        self.input_temps = np.tile(self.input_temps, (scenarios, 1))
+        self.output_masses = np.tile(self.output_masses, (scenarios, 1))
+
+        self._lower = np.zeros(shape)
+        self._diag = np.zeros(shape)
+        self._upper = np.zeros(shape)
+        self._c_work = np.zeros(shape)
+        self._d_work = np.zeros(shape)
+
+        # Which scenarios have had the entire tank circulate
+        self.circulated = np.zeros(scenarios, dtype=bool)
+
+
+    def _solve(self, A_lower, A_diag, A_upper, C) -> np.ndarray:
+        """Solve every scenario's tridiagonal system together
+
+        Arguments:
+            A_lower {np.ndarray} -- sub-diagonals (element 0 is ignored)
+            A_diag {np.ndarray} -- main diagonals
+            A_upper {np.ndarray} -- super-diagonals (last element ignored)
+            C {np.ndarray} -- right hand sides
+        """
+
+        return solve_tridiagonal(A_lower, A_diag, A_upper, C,
+                                 self._c_work, self._d_work)
+
+
+    def _tank_circulated(self, circulated, mass):
+        """Flag scenarios whose entire tank was injected in this timestep
+
+        Arguments:
+            circulated {np.ndarray} -- scenarios with mass left over
+            mass {np.ndarray} -- mass of inflowing fluid per scenario
+        """
+        self.circulated |= circulated
+
+
+    def inject_heat(self, mass_in, T_in: float):
+        """Inject heat in this timestemp
+
+        As Tank.inject_heat, with one mass per scenario. Returns the energy
+        absorbed by each scenario's tank.
+
+        Arguments:
+            mass_in {np.ndarray} -- mass being injected per scenario
+            T_in {float} -- temperature at which the fluid is returning
+        """
+
+        delta_T = T_in - self.get_hp_draw_temp()
+
+        # Don't heat where we have a smaller than 5 degree difference
+        mass_in = np.where(delta_T<5, 0.0, mass_in)
+
+        Q_in = mass_in * self.fluid_specific_heat * delta_T
+
+        self.output_masses[:, self.heater_draw_node] += mass_in
+
+        self._reinject(T_in, mass_in)
+
+        return Q_in
+
+
+    def draw_load(self, Q_out):
+        """Draw out some energy from each scenario's tank in this timestep
+
+        Returns the amount of mass flowing to provide this load.
+
+        Arguments:
+            Q_out {np.ndarray} -- the energy to extract (kWh) per scenario
+         """
+
+        Q_out = np.broadcast_to(np.asarray(Q_out, dtype=float),
+                                (self.scenarios,))
+
+        delta_T = self.load_supply_temp - self.load_return_temp
+        tank_delta = self.get_outflow_temp() - self.load_return_temp
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Where the top node is hot enough we'll mix with the return,
+            # otherwise we need more mass
+            mass_in_network = Q_out / (delta_T * self.fluid_specific_heat)
+            mass_from_tank = np.where(
+                self.get_outflow_temp() > self.load_supply_temp,
+                mass_in_network * delta_T / tank_delta,
+                Q_out / (tank_delta * self.fluid_specific_heat)
+            )
+
+        mass_from_tank = np.where(Q_out == 0, 0.0, mass_from_tank)
+
+        # Return fluid into whichever node(s) want(s) it
+        self._reinject(self.load_return_temp, mass_from_tank)
+
+        self.output_masses[:, self.outflow_node] += mass_from_tank
+
+        return mass_from_tank
+
+
+    def energy_stored(self) -> np.ndarray:
+        """Get energy currently in each scenario's tank (kWh)
+        """
+
+        return ( self.node_temps.sum(axis=1)
+                 * self._node_mass
+                 * self.fluid_specific_heat )
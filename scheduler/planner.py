@@ -0,0 +1,481 @@
+# Planning engines
+# Plan heat pump operation over the whole horizon at once, either by linear
+# programming on a linearised energy balance of the tank or by dynamic
+# programming over its stored energy
+
+from . import hotwatertank
+import pandas as pd
+import numpy as np
+import copy
+from typing import Tuple
+
+
+class PlannerError(Exception):
+    pass
+
+
+class LinearPlanner(object):
+    """Plans the heat pump schedule by mixed-integer linear programming
+
+    Treats the tank as a single store of energy: each hour it loses the
+    demand and its wall losses and gains whatever the heat pump delivers
+    (at its nominal power when on). The comfort condition becomes a minimum
+    stored energy, and the on/off schedule is chosen to minimise imported
+    electricity. The result is only an approximation of the full tank model,
+    so should be checked with the Simulator.
+
+    A stratified tank keeps its top node hot long after its mean temperature
+    has dropped below the comfort condition, so the minimum energy is best
+    found from where the full model fails (see free_running_energy).
+    """
+
+    # Extra mean tank temperature (degC) to hold over the comfort condition
+    comfort_margin = 0.
+
+    # Cost (per kWh) of falling short of the comfort condition - only used
+    # so that we get an answer when it can't be met
+    shortfall_penalty = 1000.
+
+    # Cost of each hour's heating, so that ties go to fewer hours
+    heating_penalty = 1e-3
+
+    # If a plan fails in simulation, raise the margin by this much (degC) and
+    # try again, up to this many plans in total
+    margin_step = 2.
+    attempts = 4
+
+    def __init__(
+            self,
+            tank,
+            heatpump,
+            minimum_temperature = 38
+        ):
+        """Set up the planner for the tank and heat pump
+
+        Arguments:
+            tank {Tank} -- the hot water tank (for its characteristics)
+            heatpump {HeatPump} -- the heat pump
+            minimum_temperature {float} -- the comfort condition
+        """
+        self.tank = tank
+        self.heatpump = copy.copy(heatpump)
+        self.minimum_temperature = minimum_temperature
+
+
+    def _heat_capacity(self) -> float:
+        """Energy (kWh) to raise the whole tank by one degree
+        """
+        return self.tank._mass * self.tank.fluid_specific_heat
+
+
+    def _hourly_draw(
+            self,
+            forecast: pd.DataFrame,
+            demand: pd.Series
+        ) -> np.ndarray:
+        """Get the energy drawn from the tank each hour by demand and losses
+
+        Arguments:
+            forecast {pd.DataFrame} -- the forecast weather conditions
+            demand {pd.Series} -- the anticipated heating demand
+        """
+
+        temperatures = forecast['temperature'].to_numpy(dtype=float)
+        hourly_demand = demand.reindex(forecast.index).to_numpy(dtype=float)
+
+        # Wall losses, taking the current mean temperature as typical
+        mean_temperature = (float(self.tank.energy_stored())
+                            / self._heat_capacity())
+        loss_UA = self.tank.wall_U_value * self.tank._loss_areas.sum()
+        losses = np.maximum(loss_UA * (mean_temperature - temperatures), 0.)
+
+        return hourly_demand + losses
+
+
+    def free_running_energy(
+            self,
+            forecast: pd.DataFrame,
+            demand: pd.Series
+        ) -> np.ndarray:
+        """Get the stored energy at the end of each hour with no heating
+
+        Useful for finding the comfort energy: if the full model fails at some
+        hour with no heating, the energy here at the end of the hour before is
+        (about) the least the linear model can allow.
+
+        Arguments:
+            forecast {pd.DataFrame} -- the forecast weather conditions
+            demand {pd.Series} -- the anticipated heating demand
+        """
+        return (float(self.tank.energy_stored())
+                - np.cumsum(self._hourly_draw(forecast, demand)))
+
+
+    def plan(
+            self,
+            forecast: pd.DataFrame,
+            demand: pd.Series,
+            surplus: pd.Series,
+            comfort_energy: float = None,
+            comfort_margin: float = None
+        ) -> pd.Series:
+        """Find the schedule which minimises imported electricity
+
+        Returns a schedule of 1s and 0s on the forecast index.
+
+        Arguments:
+            forecast {pd.DataFrame} -- the forecast weather conditions (only
+                temperature is needed)
+            demand {pd.Series} -- the anticipated heating demand
+            surplus {pd.Series} -- the anticipated generation surplus
+            comfort_energy {float} -- least energy (kWh) the tank may hold; by
+                default, that of a fully mixed tank at the minimum temperature
+            comfort_margin {float} -- override the class comfort_margin
+        """
+
+        if comfort_margin is None:
+            comfort_margin = self.comfort_margin
+
+        heat_capacity = self._heat_capacity()
+
+        if comfort_energy is None:
+            comfort_energy = heat_capacity * self.minimum_temperature
+
+        hours = forecast.index.size
+
+        temperatures = forecast['temperature'].to_numpy(dtype=float)
+        hourly_draw = self._hourly_draw(forecast, demand)
+        hourly_surplus = surplus.reindex(forecast.index).to_numpy(dtype=float)
+
+        # Tank energy (kWh, relative to 0 degC)
+        energy_now = float(self.tank.energy_stored())
+
+        energy_min = comfort_energy + heat_capacity * comfort_margin
+
+        # The heat pump gives up once the tank is within 5 degrees of its
+        # flow temperature
+        energy_max = max(heat_capacity * (self.heatpump.T_out - 5), energy_now)
+
+        # Heat pump runs at nominal power when on, at an efficiency which
+        # depends on the outside temperature
+        heat_per_hour = self.heatpump.nominal_power * 1.
+        elec_per_hour = np.empty(hours)
+        for hour in range(hours):
+            self.heatpump.T_amb = temperatures[hour]
+            elec_per_hour[hour] = heat_per_hour / self.heatpump.COP()
+
+        # Variables, in blocks of one per hour: on/off, heat delivered,
+        # electricity imported, energy stored at the end of the hour and
+        # shortfall below the comfort condition
+        on, heat, imported, stored, shortfall = (
+            np.arange(hours) + block * hours for block in range(5)
+        )
+        variables = 5 * hours
+
+        rows = []
+        lower = []
+        upper = []
+
+        def add_constraint(coefficients, low, high):
+            row = np.zeros(variables)
+            for column, value in coefficients:
+                row[column] += value
+            rows.append(row)
+            lower.append(low)
+            upper.append(high)
+
+        for hour in range(hours):
+            # Energy balance: stored = previous + heat - demand - losses
+            balance = [(stored[hour], 1.), (heat[hour], -1.)]
+            previous = energy_now
+            if hour:
+                balance.append((stored[hour-1], -1.))
+                previous = 0.
+            net_draw = previous - hourly_draw[hour]
+            add_constraint(balance, net_draw, net_draw)
+
+            # We can only deliver heat when the heat pump is on
+            add_constraint([(heat[hour], 1.), (on[hour], -heat_per_hour)],
+                           -np.inf, 0.)
+
+            # We import whatever the surplus doesn't cover
+            add_constraint([(on[hour], elec_per_hour[hour]),
+                            (imported[hour], -1.)],
+                           -np.inf, max(hourly_surplus[hour], 0.))
+
+            # Comfort condition (softened so there's always an answer)
+            add_constraint([(stored[hour], 1.), (shortfall[hour], 1.)],
+                           energy_min, np.inf)
+
+        objective = np.zeros(variables)
+        objective[on] = self.heating_penalty
+        objective[imported] = 1.
+        objective[shortfall] = self.shortfall_penalty
+
+        low_bounds = np.zeros(variables)
+        low_bounds[stored] = -np.inf
+        high_bounds = np.full(variables, np.inf)
+        high_bounds[on] = 1.
+        high_bounds[heat] = heat_per_hour
+        high_bounds[stored] = energy_max
+
+        rows = np.array(rows)
+        lower = np.array(lower)
+        upper = np.array(upper)
+
+        # SciPy is only imported when we need it (it's slow to import).
+        # milp only arrived in SciPy 1.9 - without it we solve the LP
+        # relaxation
+        import scipy.optimize
+
+        milp = getattr(scipy.optimize, 'milp', None)
+
+        if milp:
+            from scipy.optimize import LinearConstraint, Bounds
+
+            integrality = np.zeros(variables)
+            integrality[on] = 1
+
+            result = milp(
+                objective,
+                constraints=LinearConstraint(rows, lower, upper),
+                integrality=integrality,
+                bounds=Bounds(low_bounds, high_bounds)
+            )
+            solution_ok = result.success
+        else:
+            # Solve the relaxation, splitting our constraints into equalities
+            # and upper bounds for linprog
+            equal = lower == upper
+            has_upper = ~equal & np.isfinite(upper)
+            has_lower = ~equal & np.isfinite(lower)
+
+            result = scipy.optimize.linprog(
+                objective,
+                A_ub=np.vstack([rows[has_upper], -rows[has_lower]]),
+                b_ub=np.concatenate([upper[has_upper], -lower[has_lower]]),
+                A_eq=rows[equal],
+                b_eq=lower[equal],
+                bounds=list(zip(low_bounds, high_bounds))
+            )
+            solution_ok = result.status == 0
+
+        if not solution_ok:
+            raise PlannerError('Could not solve schedule: ' + str(result.message))
+
+        # Any hour with heating in it is an 'on' hour (the relaxed problem can
+        # ask for part-hours)
+        return pd.Series(
+            (result.x[on] > 1e-6).astype(int),
+            index=forecast.index
+        )
+
+
+class DynamicPlanner(object):
+    """Plans the heat pump schedule by dynamic programming
+
+    The tank's state is reduced to its stored energy, bucketed into bins.
+    For each hour, every bin is stepped through the full tank model with the
+    heat pump on and off (all together, as one TankBatch) to find which bin
+    it ends up in and what electricity it imports. A backward pass over the
+    horizon then gives the schedule importing least while meeting the comfort
+    condition, in a time which depends only on hours and bins.
+
+    Each bin's tank is the current tank's temperature profile shifted up or
+    down to match the bin's energy, so as with the LinearPlanner the result
+    should be checked with the Simulator.
+    """
+
+    # Number of stored energy bins
+    bins = 40
+
+    # Extra outflow temperature (degC) to hold over the comfort condition
+    comfort_margin = 0.
+
+    # Cost of each hour's heating, so that ties go to fewer hours
+    heating_penalty = 1e-3
+
+    # If a plan fails in simulation, raise the margin by this much (degC) and
+    # try again, up to this many plans in total
+    margin_step = 2.
+    attempts = 4
+
+    def __init__(
+            self,
+            tank,
+            simulator,
+            bins: int = None
+        ):
+        """Set up the planner for the tank
+
+        Arguments:
+            tank {Tank} -- the hot water tank (its current state is the
+                starting point)
+            simulator {Simulator} -- the simulator, for its heat pump, comfort
+                condition and timestep
+            bins {int} -- override the number of stored energy bins
+        """
+        self.tank = tank
+        self.simulator = simulator
+
+        if bins:
+            self.bins = bins
+
+
+    def _bin_profiles(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the energy and a tank temperature profile for each bin
+
+        Bins are evenly spaced in stored energy, from the tank being at the
+        load return temperature to it being at the heat pump flow temperature.
+        """
+
+        tank = self.tank
+        heat_capacity = tank._mass * tank.fluid_specific_heat
+
+        bin_energies = np.linspace(
+            tank.load_return_temp * heat_capacity,
+            self.simulator.heatpump.T_out * heat_capacity,
+            self.bins
+        )
+        mean_temperatures = bin_energies / heat_capacity
+
+        current = np.asarray(tank.node_temps, dtype=float)
+        profiles = np.clip(
+            current + (mean_temperatures - current.mean())[:, np.newaxis],
+            tank.load_return_temp,
+            self.simulator.heatpump.T_out
+        )
+
+        # Clipping may have moved things a little - take the real energies
+        energies = ( profiles.sum(axis=1) * tank._node_mass
+                     * tank.fluid_specific_heat )
+
+        return energies, profiles
+
+
+    def _step_hour(
+            self,
+            profiles: np.ndarray,
+            temperature: float,
+            demand: float,
+            minimum_temperature: float
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Run every profile through one hour with the heat pump off and on
+
+        Returns stored energy at the end of the hour, electricity used and
+        whether the comfort condition held, each of shape (2, profiles) with
+        'off' first.
+
+        Arguments:
+            profiles {np.ndarray} -- starting temperatures, one row per state
+            temperature {float} -- the ambient temperature this hour
+            demand {float} -- the demand this hour
+            minimum_temperature {float} -- the comfort condition
+        """
+
+        states = profiles.shape[0]
+
+        tank_batch = hotwatertank.TankBatch.from_tank(self.tank, 2 * states)
+        tank_batch.node_temps = np.vstack([profiles, profiles])
+
+        heating = np.repeat([False, True], states)
+        active = np.ones(2 * states, dtype=bool)
+
+        elec = self.simulator.run_batch_hour(
+            tank_batch, temperature, demand, heating, active
+        )
+
+        ok = active & (tank_batch.get_outflow_temp() >= minimum_temperature)
+
+        return (
+            tank_batch.energy_stored().reshape(2, states),
+            elec.reshape(2, states),
+            ok.reshape(2, states)
+        )
+
+
+    def plan(
+            self,
+            forecast: pd.DataFrame,
+            demand: pd.Series,
+            surplus: pd.Series,
+            comfort_margin: float = None
+        ) -> pd.Series:
+        """Find the schedule which minimises imported electricity
+
+        Returns a schedule of 1s and 0s on the forecast index.
+
+        Arguments:
+            forecast {pd.DataFrame} -- the forecast weather conditions (only
+                temperature is needed)
+            demand {pd.Series} -- the anticipated heating demand
+            surplus {pd.Series} -- the anticipated generation surplus
+            comfort_margin {float} -- override the class comfort_margin
+        """
+
+        if comfort_margin is None:
+            comfort_margin = self.comfort_margin
+
+        minimum_temperature = (self.simulator.minimum_temperature
+                               + comfort_margin)
+
+        hours = forecast.index.size
+
+        temperatures = forecast['temperature'].to_numpy(dtype=float)
+        hourly_demand = demand.reindex(forecast.index).to_numpy(dtype=float)
+        hourly_surplus = surplus.reindex(forecast.index).to_numpy(dtype=float)
+
+        energies, profiles = self._bin_profiles()
+
+        def nearest_bin(energy):
+            return np.abs(energy[..., np.newaxis] - energies).argmin(axis=-1)
+
+        def import_cost(elec, hour):
+            if hourly_surplus[hour] > 0:
+                return np.maximum(elec - hourly_surplus[hour], 0.)
+            return elec
+
+        # The first hour starts from the actual tank; after that from bins
+        start = np.asarray(self.tank.node_temps, dtype=float)[np.newaxis, :]
+
+        # Transitions (next bin) and costs for each hour, action and bin
+        next_bins = []
+        costs = []
+
+        for hour in range(hours):
+            energy, elec, ok = self._step_hour(
+                start if hour == 0 else profiles,
+                temperatures[hour],
+                hourly_demand[hour],
+                minimum_temperature
+            )
+
+            cost = import_cost(elec, hour)
+            cost[1] += self.heating_penalty
+            cost[~ok] = np.inf
+
+            next_bins.append(nearest_bin(energy))
+            costs.append(cost)
+
+        # Backward pass: least cost to the end of the horizon from each bin
+        value = np.zeros(self.bins)
+        choices = [None] * hours
+
+        for hour in range(hours-1, -1, -1):
+            totals = costs[hour] + value[next_bins[hour]]
+            choices[hour] = totals.argmin(axis=0)
+            value = totals.min(axis=0)
+
+        if not np.isfinite(value[0]):
+            raise PlannerError('No schedule meets the comfort condition')
+
+        # Forward pass: follow the choices from where we are now
+        schedule = np.zeros(hours, dtype=int)
+        state = 0
+
+        for hour in range(hours):
+            action = choices[hour][state]
+            schedule[hour] = action
+            state = next_bins[hour][action, state]
+
+        return pd.Series(schedule, index=forecast.index)
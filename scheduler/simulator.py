@@ -17,9 +17,99 @@ class Simulator(object):
             heatpump {object} -- the heatpump to be used in the simulation
         """
         self.minimum_temperature = minimum_temperature
-        self.heatpump = copy.deepcopy(heatpump)
+        self.heatpump = copy.copy(heatpump)
         self.tank_timestep_multiple = tank_timestep_multiple
 
+        # Our own copy of the tank to run scenarios on, and the tank it was
+        # copied from
+        self.tank = None
+        self._source_tank = None
+
+        # Batch of tanks for run_batch_simulation
+        self.tank_batch = None
+
+        # Checkpoints from the last run: the tank state and running totals at
+        # the end of each hour that passed, and what the run started from.
+        self._checkpoints = []
+        self._checkpoint_inputs = None
+        self._checkpoint_start = None
+        self._checkpoint_schedule = None
+
+        # How many hours we've actually simulated (not resumed past)
+        self.simulated_hours = 0
+
+
+    def _working_tank(
+            self,
+            tank: hotwatertank.Tank,
+            state: hotwatertank.TankState
+        ) -> hotwatertank.Tank:
+        """Get a private tank in the same state as the given one
+
+        The tank is only deep copied the first time we see it - after that we
+        just restore its state, which is all that changes between runs.
+
+        Arguments:
+            tank {Tank} -- the tank to copy
+            state {TankState} -- the tank's current state
+        """
+        if self._source_tank is not tank:
+            self._source_tank = tank
+            self.tank = copy.deepcopy(tank)
+        else:
+            self.tank.restore(state)
+
+        return self.tank
+
+
+    def _resume_hour(
+            self,
+            inputs: tuple,
+            start_state: hotwatertank.TankState,
+            schedule_values: np.ndarray
+        ) -> int:
+        """Find the first hour we can't take from the last run's checkpoints
+
+        The last run's checkpoints are good up to the first hour where the
+        schedule differs, so long as we started from the same tank state with
+        the same forecast, demand and surplus.
+
+        Arguments:
+            inputs {tuple} -- forecast, demand and surplus for this run
+            start_state {TankState} -- the tank state we're starting from
+            schedule_values {np.ndarray} -- the schedule for this run
+        """
+        if (self._checkpoint_inputs is None
+                or any(new is not old for new, old
+                       in zip(inputs, self._checkpoint_inputs))
+                or start_state != self._checkpoint_start):
+            return 0
+
+        changed = np.flatnonzero(schedule_values != self._checkpoint_schedule)
+        first_change = changed[0] if changed.size else schedule_values.size
+
+        return min(first_change, len(self._checkpoints))
+
+
+    def _hourly_arrays(
+            self,
+            forecast: pd.DataFrame,
+            demand: pd.Series,
+            surplus: pd.Series
+        ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get temperature, demand and surplus as arrays on the forecast hours
+
+        Arguments:
+            forecast {pd.DataFrame} -- the forecast weather conditions
+            demand {pd.Series} -- the anticipated heating demand
+            surplus {pd.Series} -- the anticipated generation surplus
+        """
+        return (
+            forecast['temperature'].to_numpy(dtype=float),
+            demand.reindex(forecast.index).to_numpy(dtype=float),
+            surplus.reindex(forecast.index).to_numpy(dtype=float)
+        )
+
 
     def run_simulation(
             self,
@@ -35,13 +125,19 @@ class Simulator(object):
         Run the current heating schedule forward to see if we breach the comfort
         criteria before we run out of forecast road.
 
+        If the last run had the same tank, forecast, demand and surplus (the
+        same objects) the simulation resumes from the first hour where the
+        schedule changed, rather than starting from scratch. Logged runs always
+        start from the beginning.
+
         Arguments:
             tank {object} -- the current hot water tank model (for initial
                 conditions)
             forecast {pd.DataFrame} -- the forecast weather conditions from
                 this time (only temperature is needed)
             demand {pd.Series} -- the anticipated heating demand
-            schedule {pd.Series} -- the planned heating schedule
+            schedule {pd.Series} -- the planned heating schedule (or a 0/1
+                array, one per forecast hour)
             surplus {pd.Series} -- the anticipated generation surplus
             log_file {typing.TextIO} -- the (open) file to log to (optional)
         """
@@ -65,7 +161,8 @@ class Simulator(object):
             log_file.write('\n')
 
         # We don't want to lose the state of the actual tank
-        self.tank = copy.deepcopy(tank)
+        start_state = tank.snapshot()
+        self._working_tank(tank, start_state)
 
         self.tank.timestep = 1. / self.tank_timestep_multiple
         self.heatpump.timestep = 1. / self.tank_timestep_multiple
@@ -73,19 +170,52 @@ class Simulator(object):
         total_elec_in = 0.
         total_elec_imported = 0.
 
+        # Pull everything into plain arrays, so that the loop below deals
+        # only in integer positions rather than timestamp lookups
+        temperatures, hourly_demand, hourly_surplus = self._hourly_arrays(
+            forecast, demand, surplus
+        )
+        if isinstance(schedule, np.ndarray):
+            schedule_values = schedule.astype(int)
+        else:
+            schedule_values = schedule.reindex(forecast.index).to_numpy(
+                copy=True
+            )
+
+        # Can we pick up where the last run's schedule changed?
+        inputs = (forecast, demand, surplus)
+
+        resume_hour = 0 if log_file else self._resume_hour(
+            inputs, start_state, schedule_values
+        )
+
+        if resume_hour:
+            state, total_elec_in, total_elec_imported = (
+                self._checkpoints[resume_hour-1]
+            )
+            self.tank.restore(state)
+
+        del self._checkpoints[resume_hour:]
+        self._checkpoint_inputs = inputs
+        self._checkpoint_start = start_state
+        self._checkpoint_schedule = schedule_values
+
         # Let's set off for the future
-        for index, row in forecast.iterrows():
+        for hour in range(resume_hour, temperatures.size):
+
+            self.simulated_hours += 1
 
             # Let the tank and the HP know the ambient temp
-            self.tank.T_amb = forecast.loc[index,'temperature']
-            self.heatpump.T_amb = forecast.loc[index,'temperature']
+            self.tank.T_amb = temperatures[hour]
+            self.heatpump.T_amb = temperatures[hour]
 
             # Now run the tank timesteps
             mass_heated_this_timestep = 0.
             elec_this_timestep = 0.
             Q_in_this_timestep = 0.
 
-            tank_substep_demand = demand[index] / self.tank_timestep_multiple
+            tank_substep_demand = (hourly_demand[hour]
+                                   / self.tank_timestep_multiple)
 
             for substep in range(0,self.tank_timestep_multiple):
 
@@ -94,7 +224,7 @@ class Simulator(object):
                     tank_output_mass = self.tank.draw_load(tank_substep_demand)
 
                     # Are we heating?
-                    if schedule[index]:
+                    if schedule_values[hour]:
 
                         # We'll try to.
                         mass_to_heat = self.heatpump.heatable_mass(
@@ -121,12 +251,15 @@ class Simulator(object):
 
                     self.tank.process_timestep()
 
-                except HotWaterTank.TankWarning as e:
+                except hotwatertank.TankWarning as e:
                     # The tank has entirely circulated in this timestep (bad news)
                     if log_file:
                         log_file.write(str(e) + '\n')
-                    return elec_this_timestep, total_elec_imported, index
+                    return (elec_this_timestep, total_elec_imported,
+                            forecast.index[hour])
                 except:
+                    # Don't trust anything we've checkpointed
+                    self._checkpoint_inputs = None
                     if log_file:
                         log_file.close
                     raise
@@ -134,10 +267,11 @@ class Simulator(object):
             total_elec_in += elec_this_timestep
 
             # Are we importing energy this timestep?
-            if (surplus[index]>0):
+            if (hourly_surplus[hour]>0):
                 # We have a surplus! Only import if it doesn't cover the need
-                if (surplus[index]<elec_this_timestep):
-                    total_elec_imported += (elec_this_timestep - surplus[index])
+                if (hourly_surplus[hour]<elec_this_timestep):
+                    total_elec_imported += (elec_this_timestep
+                                            - hourly_surplus[hour])
             else:
                 # no surplus. Import all
                 total_elec_imported += elec_this_timestep
@@ -149,16 +283,16 @@ class Simulator(object):
                 data = np.append(
                     data,
                     [
-                        str(index),
-                        forecast.loc[index,'temperature'],
-                        demand[index],
+                        str(forecast.index[hour]),
+                        temperatures[hour],
+                        hourly_demand[hour],
                         self.tank.energy_stored(),
                         tank_output_mass,
                         Q_in_this_timestep,
-                        surplus[index],
+                        hourly_surplus[hour],
                         elec_this_timestep,
                         mass_heated_this_timestep,
-                        schedule[index]
+                        schedule_values[hour]
                     ]
                 )
                 log_file.write(','.join(str(x) for x in data))
@@ -170,7 +304,181 @@ class Simulator(object):
                 if (log_file):
                     log_file.write('COMFORT CONDITION BREACHED\n')
 
-                return total_elec_in, total_elec_imported, index
+                return total_elec_in, total_elec_imported, forecast.index[hour]
+
+            # We made it through this hour - remember how
+            self._checkpoints.append(
+                (self.tank.snapshot(), total_elec_in, total_elec_imported)
+            )
 
         # We succeeded.
-        return total_elec_in, total_elec_imported, False
\ No newline at end of file
+        return total_elec_in, total_elec_imported, False
+
+
+    def run_batch_hour(
+            self,
+            tank_batch: hotwatertank.TankBatch,
+            temperature: float,
+            demand: float,
+            heating: np.ndarray,
+            active: np.ndarray
+        ) -> np.ndarray:
+        """Run one hour of tank timesteps for every scenario in a batch
+
+        Returns the electricity used by each scenario. Scenarios whose entire
+        tank circulates are dropped from active (which is updated in place)
+        and sit idle from then on, as do any that weren't active to start
+        with.
+
+        Arguments:
+            tank_batch {TankBatch} -- the tanks to run
+            temperature {float} -- the ambient temperature this hour
+            demand {float or np.ndarray} -- the demand this hour
+            heating {np.ndarray} -- whether each scenario is heating
+            active {np.ndarray} -- which scenarios are still running
+        """
+
+        tank_batch.timestep = 1. / self.tank_timestep_multiple
+        self.heatpump.timestep = 1. / self.tank_timestep_multiple
+
+        # Let the tank and the HP know the ambient temp
+        tank_batch.T_amb = temperature
+        self.heatpump.T_amb = temperature
+
+        elec_this_timestep = np.zeros(tank_batch.scenarios)
+
+        tank_substep_demand = np.asarray(demand) / self.tank_timestep_multiple
+
+        for substep in range(0,self.tank_timestep_multiple):
+
+            # Draw demand from the tank
+            tank_batch.draw_load(np.where(active, tank_substep_demand, 0.))
+
+            # Who's heating?
+            heating_now = heating & active & ~tank_batch.circulated
+
+            mass_to_heat = np.where(
+                heating_now,
+                self.heatpump.heatable_mass(tank_batch.get_hp_draw_temp()),
+                0.
+            )
+
+            Q_in = tank_batch.inject_heat(
+                mass_to_heat,
+                self.heatpump.T_out
+            )
+
+            # If we did any heating, add the power
+            heated = (Q_in != 0) & ~tank_batch.circulated
+            elec_in = self.heatpump.deliver_heat(
+                tank_batch.get_hp_draw_temp(),
+                np.where(heated, mass_to_heat, 0.)
+            )
+
+            elec_this_timestep += np.where(heated, elec_in, 0.)
+
+            tank_batch.process_timestep()
+
+            active &= ~tank_batch.circulated
+
+        return elec_this_timestep
+
+
+    def run_batch_simulation(
+            self,
+            tank: object,
+            forecast: pd.DataFrame,
+            demand: pd.Series,
+            schedules: pd.DataFrame,
+            surplus: pd.Series
+        ) -> Tuple[np.ndarray, np.ndarray, list]:
+        """Simulate several heating schedules at once
+
+        Runs every candidate schedule forward together using a TankBatch, so
+        that evaluating a set of scenarios costs roughly the same as one.
+        Returns arrays of electricity used and imported, and a list of failure
+        times (False where a scenario succeeded), one entry per schedule. No
+        logging is done - rerun the chosen schedule through run_simulation if
+        a log is wanted.
+
+        Arguments:
+            tank {object} -- the current hot water tank model (for initial
+                conditions)
+            forecast {pd.DataFrame} -- the forecast weather conditions from
+                this time (only temperature is needed)
+            demand {pd.Series} -- the anticipated heating demand
+            schedules {pd.DataFrame} -- the candidate heating schedules, one
+                column per scenario on the same index as the forecast
+            surplus {pd.Series} -- the anticipated generation surplus
+        """
+
+        scenarios = schedules.shape[1]
+
+        # We don't want to lose the state of the actual tank
+        self.tank_batch = hotwatertank.TankBatch.from_tank(tank, scenarios)
+
+        # Pull everything into plain arrays, hour by hour
+        temperatures, hourly_demand, hourly_surplus = self._hourly_arrays(
+            forecast, demand, surplus
+        )
+        heating = schedules.reindex(forecast.index).to_numpy(dtype=bool)
+
+        total_elec_in = np.zeros(scenarios)
+        total_elec_imported = np.zeros(scenarios)
+
+        elec_used = np.zeros(scenarios)
+        elec_imported = np.zeros(scenarios)
+        failure_times = [False] * scenarios
+
+        # Scenarios that haven't failed yet
+        active = np.ones(scenarios, dtype=bool)
+
+        for hour, index in enumerate(forecast.index):
+
+            still_going = active.copy()
+
+            elec_this_timestep = self.run_batch_hour(
+                self.tank_batch,
+                temperatures[hour],
+                hourly_demand[hour],
+                heating[hour],
+                active
+            )
+
+            # Any tank that has entirely circulated in this timestep has
+            # failed (bad news) - report as run_simulation does
+            circulated = still_going & ~active
+            elec_used[circulated] = elec_this_timestep[circulated]
+            elec_imported[circulated] = total_elec_imported[circulated]
+            for n in np.flatnonzero(circulated):
+                failure_times[n] = index
+
+            total_elec_in += elec_this_timestep
+
+            # Are we importing energy this timestep? Only import what the
+            # surplus doesn't cover.
+            if (hourly_surplus[hour]>0):
+                total_elec_imported += np.maximum(
+                    elec_this_timestep - hourly_surplus[hour], 0.
+                )
+            else:
+                total_elec_imported += elec_this_timestep
+
+            # Which scenarios have failed the comfort condition?
+            failed = active & (self.tank_batch.get_outflow_temp()
+                               < self.minimum_temperature)
+
+            elec_used[failed] = total_elec_in[failed]
+            elec_imported[failed] = total_elec_imported[failed]
+            for n in np.flatnonzero(failed):
+                failure_times[n] = index
+            active &= ~failed
+
+            if not active.any():
+                break
+
+        # The rest succeeded.
+        elec_used[active] = total_elec_in[active]
+        elec_imported[active] = total_elec_imported[active]
+
+        return elec_used, elec_imported, failure_times
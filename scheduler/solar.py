@@ -0,0 +1,173 @@
+# Precomputed sun positions and clear sky irradiance for a site
+import numpy as np
+import pandas as pd
+import os
+import tempfile
+import warnings
+
+
+class SolarTable(object):
+    """Hourly sun position and clear sky irradiance at a site, a year per file
+
+    Each year is a .npy file holding a (fields x hours) float array, with
+    hours counted from the start of the year in UTC. A year is worked out
+    with pvlib the first time it's needed and memory-mapped after that, so
+    looking up a forecast's hours is just indexing. With no directory
+    everything is worked out as it's asked for.
+    """
+
+    # The hourly fields we keep, in the order they're stored
+    fields = ['zenith', 'apparent_zenith', 'azimuth', 'ghi', 'dni', 'dhi']
+
+    def __init__(self, location, directory: str = None, model: str = 'ineichen'):
+        """Set up the table for a site
+
+        Arguments:
+            location {pvlib.location.Location} -- the site
+            directory {string} -- directory holding the table files (or None)
+            model {string} -- pvlib clear sky model
+        """
+
+        self.location = location
+        self.directory = directory
+        self.model = model
+
+        # Years' arrays we've opened so far
+        self._years = {}
+
+
+    def _filename(self, year: int) -> str:
+        """Get the file holding a year
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        return os.path.join(
+            self.directory,
+            f'solar-{self.location.latitude},{self.location.longitude},'
+            f'{self.location.altitude}-{self.model}-{year}.npy'
+        )
+
+
+    def _year_start(self, year: int) -> pd.Timestamp:
+        """Get the first hour of a year
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        return pd.Timestamp(year=year, month=1, day=1, tz='UTC')
+
+
+    def _year(self, year: int) -> np.ndarray:
+        """Get a year's array, memory-mapped read only
+
+        Works it out and saves it if we don't have it yet. If it can't be
+        saved we keep the worked out array in memory instead.
+
+        Arguments:
+            year {int} -- the year (UTC)
+        """
+
+        if year not in self._years:
+            filename = self._filename(year)
+
+            if not os.path.exists(filename):
+                hours = int((self._year_start(year + 1) - self._year_start(year))
+                            // pd.Timedelta(hours=1))
+                values = self.compute(pd.date_range(
+                    self._year_start(year), periods=hours, freq='h'
+                ))
+
+                if not self._save(filename, values):
+                    self._years[year] = values
+                    return values
+
+            self._years[year] = np.load(filename, mmap_mode='r')
+
+        return self._years[year]
+
+
+    def _save(self, filename: str, values: np.ndarray) -> bool:
+        """Save a year's array, returning whether it was saved
+
+        Written to a temporary file and moved into place, so other processes
+        never see half a table.
+
+        Arguments:
+            filename {string} -- the year's file
+            values {np.ndarray} -- its array
+        """
+
+        temporary = None
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+            with os.fdopen(descriptor, 'wb') as table:
+                np.save(table, values)
+
+            os.replace(temporary, filename)
+        except OSError as err:
+            warnings.warn(f'Could not save solar table {filename}: {err}')
+
+            if temporary and os.path.exists(temporary):
+                os.remove(temporary)
+
+            return False
+
+        return True
+
+
+    def compute(self, times: pd.DatetimeIndex) -> np.ndarray:
+        """Work out the (fields x times) array with pvlib
+
+        Arguments:
+            times {pd.DatetimeIndex} -- timezone aware times
+        """
+
+        solpos = self.location.get_solarposition(times)
+        clearsky = self.location.get_clearsky(times, model=self.model)
+
+        return np.vstack(
+            [ solpos[field].to_numpy(dtype=float) for field in self.fields[:3] ]
+            + [ clearsky[field].to_numpy(dtype=float) for field in self.fields[3:] ]
+        )
+
+
+    def lookup(self, times: pd.DatetimeIndex) -> np.ndarray:
+        """Get the (fields x times) array for some times
+
+        Times that aren't on the hour are worked out rather than looked up.
+
+        Arguments:
+            times {pd.DatetimeIndex} -- timezone aware times
+        """
+
+        utc = times.tz_convert('UTC')
+        nanoseconds = utc.tz_localize(None).to_numpy(
+            dtype='datetime64[ns]'
+        ).view(np.int64)
+        hour = 3600_000_000_000
+
+        if not self.directory or (nanoseconds % hour).any():
+            return self.compute(times)
+
+        years = utc.year
+        values = np.empty((len(self.fields), len(times)))
+
+        for year in np.unique(years):
+            in_year = years == year
+            positions = (nanoseconds[in_year]
+                         - self._year_start(year).value) // hour
+
+            if in_year.all() and (np.diff(positions) == 1).all():
+                # Consecutive hours are a view onto the file
+                return self._year(year)[:, positions[0]:positions[-1] + 1]
+
+            values[:, in_year] = self._year(year)[:, positions]
+
+        return values